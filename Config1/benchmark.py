@@ -0,0 +1,161 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+import zipfile
+from tempfile import TemporaryDirectory
+from shell_emulator import ShellEmulator
+
+
+def directory_for(number, depth, fanout):
+    parts = []
+    for _ in range(depth):
+        parts.append(f"d{number % fanout}")
+        number //= fanout
+    return "/".join(reversed(parts))
+
+
+def generate_archive(zip_path, entries, depth=3, fanout=10, files_per_dir=100, file_size=256,
+                     tail_size=1 << 20, compression=zipfile.ZIP_DEFLATED):
+    line = b"0123456789 abcdefghijklmnopqrstuvwxyz ABCDEFGHIJKLMNOPQRSTUVWXYZ\n"
+    content = (line * (file_size // len(line) + 1))[:file_size]
+    log_lines = [f"{number:08d} {line.decode()}".encode() for number in range(tail_size // (len(line) + 9) + 1)]
+    with zipfile.ZipFile(zip_path, 'w', compression) as archive:
+        for number in range(entries):
+            directory = directory_for(number // files_per_dir, depth, fanout)
+            name = f"{directory}/file{number}.txt" if directory else f"file{number}.txt"
+            archive.writestr(name, content)
+        archive.writestr("logs/big.log", b"".join(log_lines))
+    return {
+        "entries": entries,
+        "depth": depth,
+        "fanout": fanout,
+        "files_per_dir": files_per_dir,
+        "file_size": file_size,
+        "tail_size": tail_size,
+        "compression": {zipfile.ZIP_STORED: "stored", zipfile.ZIP_DEFLATED: "deflated"}.get(compression, compression),
+        "archive_bytes": os.path.getsize(zip_path),
+    }
+
+
+def measure(func, iterations):
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "iterations": iterations,
+        "mean_ms": sum(timings) / len(timings) * 1000,
+        "p50_ms": timings[len(timings) // 2] * 1000,
+        "min_ms": timings[0] * 1000,
+        "max_ms": timings[-1] * 1000,
+        "peak_kib": peak / 1024,
+    }
+
+
+def run_benchmarks(zip_path, work_dir, depth, fanout, iterations=20):
+    log_file = os.path.join(work_dir, "bench_log.csv")
+    index_path = zip_path + ".idx"
+    results = {}
+
+    def start_cold():
+        if os.path.exists(index_path):
+            os.remove(index_path)
+        ShellEmulator(zip_path, log_file, "bench", persistent=False).close()
+
+    def start_warm():
+        ShellEmulator(zip_path, log_file, "bench", persistent=False).close()
+
+    results["startup_cold"] = measure(start_cold, max(1, iterations // 10))
+    start_warm()
+    results["startup_warm"] = measure(start_warm, max(1, iterations // 10))
+
+    emulator = ShellEmulator(zip_path, log_file, "bench", persistent=False)
+    leaf = "/" + directory_for(0, depth, fanout)
+    mkdir_counter = iter(range(10 ** 9))
+
+    def in_leaf(command):
+        def run():
+            emulator.cwd = leaf
+            emulator.run_command(command)
+            emulator.cwd = "/"
+        return run
+
+    commands = {
+        "ls_root": lambda: emulator.run_command("ls"),
+        "ls_leaf": in_leaf("ls"),
+        "ls_l_leaf": in_leaf("ls -l"),
+        "cd": lambda: (emulator.run_command(f"cd {leaf}"), emulator.run_command("cd /")),
+        "find_name": lambda: emulator.run_command("find -name file1*.txt"),
+        "find_substring": lambda: emulator.run_command("find file12"),
+        "mkdir": lambda: emulator.run_command(f"mkdir bench_dir{next(mkdir_counter)}"),
+        "tail": lambda: emulator.run_command("tail -n 10 logs/big.log"),
+    }
+    for name, command in commands.items():
+        results[name] = measure(command, iterations)
+    emulator.close()
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк эмулятора оболочки на синтетических архивах.")
+    parser.add_argument("--entries", type=int, nargs="+", default=[1000, 10000, 100000],
+                        help="Число файлов в архиве (можно несколько)")
+    parser.add_argument("--depth", type=int, default=3, help="Глубина дерева каталогов")
+    parser.add_argument("--fanout", type=int, default=10, help="Число подкаталогов на уровне")
+    parser.add_argument("--files-per-dir", type=int, default=100, help="Число файлов в каталоге")
+    parser.add_argument("--file-size", type=int, default=256, help="Размер каждого файла в байтах")
+    parser.add_argument("--tail-size", type=int, default=1 << 20, help="Размер файла для tail в байтах")
+    parser.add_argument("--stored", action="store_true", help="Не сжимать файлы")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--label", help="Метка прогона (по умолчанию — ревизия git)")
+    parser.add_argument("--output", default="bench_results.json", help="JSON-файл с результатами")
+    args = parser.parse_args()
+
+    report = {
+        "label": args.label or git_revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "runs": [],
+    }
+    compression = zipfile.ZIP_STORED if args.stored else zipfile.ZIP_DEFLATED
+    with TemporaryDirectory() as work_dir:
+        for entries in args.entries:
+            zip_path = os.path.join(work_dir, f"vfs_{entries}.zip")
+            started = time.perf_counter()
+            archive = generate_archive(zip_path, entries, args.depth, args.fanout, args.files_per_dir,
+                                       args.file_size, args.tail_size, compression)
+            archive["generate_seconds"] = time.perf_counter() - started
+            results = run_benchmarks(zip_path, work_dir, args.depth, args.fanout, args.iterations)
+            report["runs"].append({"archive": archive, "results": results})
+            for name, result in results.items():
+                print(f"{entries:>9} {name:<15} {result['mean_ms']:10.3f} ms  peak {result['peak_kib']:10.1f} KiB",
+                      file=sys.stderr)
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,37 +2,547 @@ import zipfile
 import os
 import csv
 import sys
+import json
+import time
+import argparse
+import threading
+import posixpath
+import struct
+import io
+import re
+import mmap
+import fnmatch
+from array import array
+from collections import deque, OrderedDict
+from collections.abc import MutableMapping
+from concurrent.futures import ThreadPoolExecutor
 from tempfile import TemporaryDirectory
-from datetime import datetime
+
+
+class DirectoryIndex:
+    """Дерево каталогов архива: каталог — словарь имя -> узел, файл — None."""
+
+    def __init__(self, names=()):
+        self.root = {}
+        for name in names:
+            self.add(name)
+
+    def add(self, name):
+        parts = [part for part in name.split("/") if part]
+        if not parts:
+            return
+        node = self.root
+        for part in parts[:-1]:
+            child = node.get(part)
+            if child is None:
+                child = node[part] = {}
+            node = child
+        if name.endswith("/"):
+            if node.get(parts[-1]) is None:
+                node[parts[-1]] = {}
+        else:
+            node.setdefault(parts[-1], None)
+
+    def get_dir(self, path):
+        node = self.root
+        for part in path.split("/") if path else ():
+            node = node.get(part)
+            if node is None:
+                return None
+        return node
+
+    def is_file(self, path):
+        parent, _, name = path.rpartition("/")
+        node = self.get_dir(parent)
+        return node is not None and name in node and node[name] is None
+
+    def exists(self, path):
+        if not path:
+            return True
+        parent, _, name = path.rpartition("/")
+        node = self.get_dir(parent)
+        return node is not None and name in node
+
+
+class OverlayIndex:
+    """Индекс с копированием при записи: изменения сеанса поверх общего базового индекса."""
+
+    def __init__(self, base):
+        self.base = base
+        self.upper = DirectoryIndex()
+
+    def add(self, name):
+        self.upper.add(name)
+
+    def get_dir(self, path):
+        lower = self.base.get_dir(path)
+        upper = self.upper.get_dir(path)
+        if upper is None:
+            return lower
+        if lower is None:
+            return upper
+        return {**lower, **upper} if upper else lower
+
+    def is_file(self, path):
+        return self.upper.is_file(path) or self.base.is_file(path)
+
+    def exists(self, path):
+        return self.upper.exists(path) or self.base.exists(path)
+
+    def commit(self, names):
+        for name in names:
+            self.base.add(name)
+        self.upper = DirectoryIndex()
+
+
+class NameIndex:
+    """Индекс имен для find: пути в порядке обхода дерева, словарь базовых имен и триграммы."""
+
+    def __init__(self, directory_index):
+        self.paths = []
+        self.is_dir = bytearray()
+        self.ends = array('I')
+        self.dir_ids = {}
+        self.basenames = {}
+        self.trigrams = {}
+        self._add_children(directory_index.root, "")
+
+    def _add_children(self, node, prefix):
+        for name in sorted(node):
+            child = node[name]
+            record = len(self.paths)
+            path = prefix + name
+            self.paths.append(path)
+            self.is_dir.append(child is not None)
+            self.ends.append(record + 1)
+            self.basenames.setdefault(name, []).append(record)
+            for trigram in {name[i:i + 3] for i in range(len(name) - 2)}:
+                postings = self.trigrams.get(trigram)
+                if postings is None:
+                    postings = self.trigrams[trigram] = array('I')
+                postings.append(record)
+            if child is not None:
+                self.dir_ids[path] = record
+                self._add_children(child, path + "/")
+                self.ends[record] = len(self.paths)
+
+    def subtree(self, path):
+        if not path:
+            return 0, len(self.paths)
+        record = self.dir_ids[path]
+        return record + 1, self.ends[record]
+
+    @staticmethod
+    def basename(path):
+        return path[path.rfind("/") + 1:]
+
+    def search_names(self, term):
+        if len(term) < 3:
+            return [record for record, path in enumerate(self.paths) if term in self.basename(path)]
+        postings = [self.trigrams.get(term[i:i + 3], ()) for i in range(len(term) - 2)]
+        return [record for record in min(postings, key=len) if term in self.basename(self.paths[record])]
+
+    def search_components(self, term):
+        records = set()
+        for record in self.search_names(term):
+            records.add(record)
+            if self.is_dir[record]:
+                records.update(range(record + 1, self.ends[record]))
+        return sorted(records)
+
+
+class SidecarEntries(MutableMapping):
+    """Метаданные архива из файла-индекса: ZipInfo создается только при обращении."""
+
+    MAGIC = b"VFSIDX01"
+    HEADER = struct.Struct("<8sQqQ")
+    RECORD = struct.Struct("<QQQIHHII")
+
+    def __init__(self, buffer, names):
+        self.buffer = buffer
+        self.records = dict(zip(names, range(len(names))))
+
+    @classmethod
+    def load(cls, index_path, zip_path):
+        stat = os.stat(zip_path)
+        with open(index_path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size < cls.HEADER.size:
+                return None
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, size, mtime_ns, count = cls.HEADER.unpack_from(buffer)
+        if magic != cls.MAGIC or size != stat.st_size or mtime_ns != stat.st_mtime_ns:
+            buffer.close()
+            return None
+        names_start = cls.HEADER.size + count * cls.RECORD.size
+        names = buffer[names_start:].decode('utf-8').split("\0") if count else []
+        return cls(buffer, names)
+
+    @classmethod
+    def save(cls, index_path, zip_path, entries):
+        stat = os.stat(zip_path)
+        infos = list(entries.values())
+        temp_path = index_path + ".tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(cls.HEADER.pack(cls.MAGIC, stat.st_size, stat.st_mtime_ns, len(infos)))
+            for info in infos:
+                year, month, day, hour, minute, second = info.date_time
+                dos_time = ((year - 1980) << 25 | month << 21 | day << 16
+                            | hour << 11 | minute << 5 | second // 2)
+                f.write(cls.RECORD.pack(info.header_offset, info.compress_size, info.file_size, info.CRC,
+                                        info.compress_type, info.flag_bits, dos_time, info.external_attr))
+            f.write("\0".join(info.filename for info in infos).encode('utf-8'))
+        os.replace(temp_path, index_path)
+
+    def __getitem__(self, name):
+        record = self.records[name]
+        if isinstance(record, zipfile.ZipInfo):
+            return record
+        (header_offset, compress_size, file_size, crc, compress_type, flag_bits, dos_time,
+         external_attr) = self.RECORD.unpack_from(self.buffer, self.HEADER.size + record * self.RECORD.size)
+        date_time = ((dos_time >> 25) + 1980, dos_time >> 21 & 0xF, dos_time >> 16 & 0x1F,
+                     dos_time >> 11 & 0x1F, dos_time >> 5 & 0x3F, (dos_time & 0x1F) * 2)
+        info = zipfile.ZipInfo(name, date_time)
+        info.header_offset = header_offset
+        info.compress_size = compress_size
+        info.file_size = file_size
+        info.CRC = crc
+        info.compress_type = compress_type
+        info.flag_bits = flag_bits
+        info.external_attr = external_attr
+        self.records[name] = info
+        return info
+
+    def __setitem__(self, name, info):
+        self.records[name] = info
+
+    def __delitem__(self, name):
+        del self.records[name]
+
+    def __contains__(self, name):
+        return name in self.records
+
+    def __iter__(self):
+        return iter(self.records)
+
+    def __len__(self):
+        return len(self.records)
+
+    def close(self):
+        self.buffer.close()
+
+
+class ContentCache:
+    """LRU-кэш распакованного содержимого файлов, ограниченный по числу байт."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.items = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            data = self.items.get(key)
+            if data is None:
+                self.misses += 1
+                return None
+            self.items.move_to_end(key)
+            self.hits += 1
+            return data
+
+    def put(self, key, data):
+        if len(data) > self.max_bytes:
+            return
+        with self.lock:
+            previous = self.items.pop(key, None)
+            if previous is not None:
+                self.size -= len(previous)
+            self.items[key] = data
+            self.size += len(data)
+            while self.size > self.max_bytes:
+                _, evicted = self.items.popitem(last=False)
+                self.size -= len(evicted)
+
+    def stats(self):
+        with self.lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self.items),
+                    "bytes": self.size, "max_bytes": self.max_bytes}
+
+
+class VfsImage:
+    """Открытый образ ВФС: метаданные и индекс каталогов, общие для сеансов."""
+
+    def __init__(self, zip_path, use_index=True, workers=None, cache_bytes=0):
+        self.zip_path = zip_path
+        self.index_path = zip_path + ".idx"
+        self.workers = workers
+        self.cache = ContentCache(cache_bytes) if cache_bytes else None
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        self._names = None
+        self._names_lock = threading.Lock()
+        self.entries = None
+        if use_index and os.path.exists(self.index_path):
+            try:
+                self.entries = SidecarEntries.load(self.index_path, zip_path)
+            except (OSError, ValueError, struct.error):
+                self.entries = None
+        if self.entries is None:
+            with zipfile.ZipFile(zip_path, 'r') as archive:
+                self.entries = {info.filename: info for info in archive.infolist()}
+            if use_index:
+                try:
+                    SidecarEntries.save(self.index_path, zip_path, self.entries)
+                except OSError:
+                    pass
+        self.index = DirectoryIndex(self.entries)
+
+    @property
+    def names(self):
+        with self._names_lock:
+            if self._names is None:
+                self._names = NameIndex(self.index)
+            return self._names
+
+    def invalidate_names(self):
+        with self._names_lock:
+            self._names = None
+
+    @property
+    def executor(self):
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(self.workers)
+            return self._executor
+
+    def open(self, info):
+        if self.cache is not None and info.file_size <= self.cache.max_bytes:
+            key = (info.filename, info.CRC)
+            data = self.cache.get(key)
+            if data is None:
+                with self.open_raw(info) as f:
+                    data = f.read()
+                self.cache.put(key, data)
+            return io.BytesIO(data)
+        return self.open_raw(info)
+
+    def open_raw(self, info):
+        if info.flag_bits & 0x1:
+            raise RuntimeError(f"File {info.filename} is encrypted")
+        raw = open(self.zip_path, 'rb')
+        try:
+            raw.seek(self.data_offset(raw, info))
+        except Exception:
+            raw.close()
+            raise
+        return zipfile.ZipExtFile(raw, 'r', info, None, True)
+
+    @staticmethod
+    def data_offset(raw, info):
+        raw.seek(info.header_offset)
+        header = raw.read(zipfile.sizeFileHeader)
+        if header[:4] != zipfile.stringFileHeader:
+            raise zipfile.BadZipFile(f"Bad local file header for {info.filename}")
+        name_length, extra_length = struct.unpack("<HH", header[26:30])
+        return info.header_offset + zipfile.sizeFileHeader + name_length + extra_length
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+        if isinstance(self.entries, SidecarEntries):
+            self.entries.close()
+
+
+class CommandStats:
+    """Время выполнения команд по типам: сводка и гистограмма задержек."""
+
+    BUCKETS = (1e-5, 1e-4, 1e-3, 1e-2, 1e-1, 1.0)
+    BUCKET_LABELS = ("<10us", "<100us", "<1ms", "<10ms", "<100ms", "<1s", ">=1s")
+
+    def __init__(self):
+        self.samples = {}
+
+    def add(self, command, seconds):
+        self.samples.setdefault(command, []).append(seconds)
+
+    def summary(self):
+        result = {}
+        for command, samples in sorted(self.samples.items()):
+            ordered = sorted(samples)
+            total = sum(ordered)
+            result[command] = {
+                "count": len(ordered),
+                "total_ms": total * 1000,
+                "mean_ms": total / len(ordered) * 1000,
+                "p50_ms": ordered[len(ordered) // 2] * 1000,
+                "p95_ms": ordered[min(len(ordered) - 1, len(ordered) * 95 // 100)] * 1000,
+                "max_ms": ordered[-1] * 1000,
+            }
+        return result
+
+    def histogram(self):
+        lines = []
+        for command, samples in sorted(self.samples.items()):
+            counts = [0] * len(self.BUCKET_LABELS)
+            for seconds in samples:
+                counts[next((i for i, bound in enumerate(self.BUCKETS) if seconds < bound), len(self.BUCKETS))] += 1
+            lines.append(f"{command or '<empty>'} ({len(samples)} commands)")
+            width = max(counts)
+            for label, count in zip(self.BUCKET_LABELS, counts):
+                if count:
+                    bar = "#" * max(1, count * 40 // width)
+                    lines.append(f"  {label:>7} {count:>8} {bar}")
+        return "\n".join(lines)
+
+
+class SessionLogger:
+    """Буферизованная запись журнала сеанса в CSV."""
+
+    HEADER = ["Date", "Time", "User", "Command", "Result"]
+    FSYNC_POLICIES = ("never", "flush", "close")
+
+    def __init__(self, path, user, buffer_size=64, flush_interval=1.0, background=False,
+                 fsync="never", max_bytes=0, backup_count=1, timing=False):
+        if fsync not in self.FSYNC_POLICIES:
+            raise ValueError(f"Unknown fsync policy: {fsync}")
+        self.path = path
+        self.user = user
+        self.timing = timing
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.rows = []
+        self.lock = threading.Lock()
+        self.last_flush = time.monotonic()
+        self._second = None
+        self._stamp = None
+        self._open()
+
+        self.wakeup = threading.Event()
+        self.closed = False
+        self.thread = None
+        if background:
+            self.thread = threading.Thread(target=self._run, daemon=True)
+            self.thread.start()
+
+    def _open(self):
+        self.file = open(self.path, mode='w', newline='')
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(self.HEADER + ["Duration (ms)"] if self.timing else self.HEADER)
+        self.file.flush()
+
+    def _timestamp(self):
+        now = time.time()
+        second = int(now)
+        if second != self._second:
+            local = time.localtime(second)
+            self._second = second
+            self._stamp = (time.strftime("%Y-%m-%d", local), time.strftime("%H:%M:%S", local))
+        return self._stamp
+
+    def log(self, command, result, duration=None):
+        date, clock = self._timestamp()
+        row = [date, clock, self.user, command, result]
+        if self.timing:
+            row.append(f"{(duration or 0.0) * 1000:.3f}")
+        # flush() в фоновом потоке подменяет self.rows под блокировкой
+        with self.lock:
+            self.rows.append(row)
+            full = len(self.rows) >= self.buffer_size
+        if full:
+            if self.thread is None:
+                self.flush()
+            else:
+                self.wakeup.set()
+        elif self.thread is None and time.monotonic() - self.last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            rows, self.rows = self.rows, []
+            self.last_flush = time.monotonic()
+            if self.file.closed:
+                return
+            self.writer.writerows(rows)
+            self.file.flush()
+            if self.fsync == "flush":
+                os.fsync(self.file.fileno())
+            if self.max_bytes and self.file.tell() >= self.max_bytes:
+                self._rotate()
+
+    def _rotate(self):
+        self.file.close()
+        if self.backup_count > 0:
+            for number in range(self.backup_count - 1, 0, -1):
+                source = f"{self.path}.{number}"
+                if os.path.exists(source):
+                    os.replace(source, f"{self.path}.{number + 1}")
+            os.replace(self.path, f"{self.path}.1")
+        self._open()
+
+    def _run(self):
+        while not self.closed:
+            self.wakeup.wait(self.flush_interval)
+            self.wakeup.clear()
+            if self.rows:
+                self.flush()
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        if self.thread is not None:
+            self.wakeup.set()
+            self.thread.join()
+        self.flush()
+        with self.lock:
+            if self.fsync != "never":
+                os.fsync(self.file.fileno())
+            self.file.close()
+
 
 class ShellEmulator:
     COLORS = {"directory": "\033[36m", "txt_file": "\033[31m",  "csv_file": "\033[32m", "reset": "\033[0m"}
+    TAIL_BLOCK_SIZE = 64 * 1024
+    READ_BLOCK_SIZE = 256 * 1024
+    READ_WINDOW = 32
 
-    def __init__(self, zip_path, log_file, user):
+    def __init__(self, zip_path, log_file, user, log_options=None, persistent=True, image=None, use_index=True,
+                 cache_bytes=0, collect_stats=False):
         self.zip_path = zip_path
         self.log_file = log_file
         self.user = user
         self.temp_dir = TemporaryDirectory()
         self.cwd = "/"
-        self.archive = zipfile.ZipFile(zip_path, 'a')
-
-        with open(log_file, mode='w', newline='') as csvfile:
-            writer = csv.writer(csvfile)
-            writer.writerow(["Date", "Time", "User", "Command", "Result"])
+        self.persistent = persistent
+        self.owns_image = image is None
+        self.image = VfsImage(zip_path, use_index, cache_bytes=cache_bytes) if image is None else image
+        self.entries = self.image.entries
+        self.index = OverlayIndex(self.image.index)
+        self.pending = {}
+        self.logger = SessionLogger(log_file, user, **(log_options or {}))
+        self.stats = CommandStats() if collect_stats else None
 
     def __del__(self):
-        self.archive.close()
+        self.close()
+
+    def close(self):
+        if self.persistent:
+            self.sync()
+        self.logger.close()
+        if self.owns_image:
+            self.image.close()
         self.temp_dir.cleanup()
 
-    def log_command(self, command, result):
-        now = datetime.now()
-        date = now.strftime("%Y-%m-%d")
-        time = now.strftime("%H:%M:%S")
-        with open(self.log_file, mode='a', newline='') as csvfile:
-            writer = csv.writer(csvfile)
-            writer.writerow([date, time, self.user, command, result])
+    def log_command(self, command, result, duration=None):
+        self.logger.log(command, result, duration)
 
     def run_command(self, command):
+        started = time.perf_counter()
         parts = command.split()
         cmd = parts[0] if parts else ""
         args = parts[1:]
@@ -49,31 +559,46 @@ class ShellEmulator:
             result = self.find(args)
         elif cmd == "tail":
             result = self.tail(args)
+        elif cmd == "grep":
+            result = self.grep(args)
+        elif cmd == "cat":
+            result = self.cat(args)
+        elif cmd == "wc":
+            result = self.wc(args)
+        elif cmd == "sync":
+            result = self.sync()
+        elif cmd == "cache":
+            result = self.cache_stats()
         else:
             result = "Command not found"
 
-        self.log_command(command, result)
+        duration = time.perf_counter() - started
+        if self.stats is not None:
+            self.stats.add(cmd, duration)
+        self.log_command(command, result, duration)
+        if cmd == "exit":
+            self.logger.flush()
         return result
     def ls(self, args):
         detailed = "-l" in args
-        entries = self.archive.namelist()
+        node = self.index.get_dir(self.cwd.strip("/")) or {}
 
         dirs = set()
         files = {}
 
-        for entry in entries:
-            if entry.startswith(self.cwd.strip("/")):
-                rel_path = entry[len(self.cwd.strip("/")):].strip("/")
-                if "/" in rel_path:
-                    dirs.add(rel_path.split("/")[0])
-                elif rel_path:
-                    files[rel_path] = os.path.splitext(rel_path)[1]
+        for name, child in node.items():
+            if child is not None:
+                dirs.add(name)
+            else:
+                files[name] = os.path.splitext(name)[1]
 
         if detailed:
             result = []
             for entry in sorted(dirs | files.keys()):
+                path = self._resolve(entry)
                 if entry in dirs:
-                    result.append(f"{self.COLORS['directory']}drwxr-xr-x 0 {entry}{self.COLORS['reset']}")
+                    mtime = self._format_mtime(self._info(path + "/"))
+                    result.append(f"{self.COLORS['directory']}drwxr-xr-x 0 {mtime} {entry}{self.COLORS['reset']}")
                 else:
                     file_type = files[entry]
                     color = (
@@ -81,9 +606,10 @@ class ShellEmulator:
                         else self.COLORS['csv_file'] if file_type == ".csv"
                         else self.COLORS['reset']
                     )
-                    info = next((i for i in self.archive.infolist() if i.filename == f"{self.cwd.strip('/')}/{entry}"), None)
+                    info = self._info(path)
                     size = info.file_size if info else 0
-                    result.append(f"{color}-rw-r--r-- {size} {entry}{self.COLORS['reset']}")
+                    mtime = self._format_mtime(info)
+                    result.append(f"{color}-rw-r--r-- {size} {mtime} {entry}{self.COLORS['reset']}")
             return "\n".join(result)
         else:
             output = []
@@ -114,81 +640,398 @@ class ShellEmulator:
             self.cwd = "/" + new_path.lstrip("/")
             return ""
 
-        new_path = os.path.normpath(os.path.join(self.cwd.strip("/"), path)).replace("\\", "/")
-
-        entries = self.archive.namelist()
-        matched_dirs = [entry for entry in entries if entry.startswith(new_path + "/")]
+        new_path = self._resolve(path)
 
-        if matched_dirs:
-            self.cwd = "/" + new_path.lstrip("/")
+        if self.index.get_dir(new_path) is not None:
+            self.cwd = "/" + new_path
             return ""
         else:
             return f"No such directory: {path}"
 
     def mkdir(self, path):
-        directory = os.path.normpath(os.path.join(self.cwd.strip("/"), path)).strip("/") + "/"
+        directory = self._resolve(path)
 
-        if any(entry == directory or entry.startswith(directory) for entry in self.archive.namelist()):
+        if self.index.exists(directory):
             return f"Directory '{path}' already exists"
 
-        self.archive.writestr(directory, "")
+        self._stage(directory + "/", b"")
         return f"Directory '{path}' created"
 
+    def sync(self):
+        if not self.pending:
+            return "Nothing to sync"
+        if not self.persistent:
+            return "Archive is read-only: changes are kept in memory"
+
+        with zipfile.ZipFile(self.zip_path, 'a') as writer:
+            for info, data in self.pending.values():
+                writer.writestr(info, data)
+            committed = {name: writer.getinfo(name) for name in self.pending}
+        self.entries.update(committed)
+        self.index.commit(committed)
+        self.image.invalidate_names()
+        self.pending.clear()
+        return f"Synced {len(committed)} change(s)"
+
+    def _stage(self, name, data):
+        info = zipfile.ZipInfo(name, time.localtime()[:6])
+        if name.endswith("/"):
+            info.external_attr = 0o40775 << 16 | 0x10
+        else:
+            info.external_attr = 0o600 << 16
+        self.pending[name] = (info, data)
+        self.index.add(name)
+
+    def _info(self, name):
+        if name in self.pending:
+            return self.pending[name][0]
+        return self.entries.get(name)
+
+    def _open_member(self, info):
+        if info.filename in self.pending:
+            return io.BytesIO(self.pending[info.filename][1])
+        return self.image.open(info)
+
     def find(self, args):
         if not args:
             return "Error: find command requires a search term"
 
-        search_term = args[0]
-        matches = [entry for entry in self.archive.namelist() if search_term in entry]
-        return "\n".join(matches) if matches else f"No files or directories found matching '{search_term}'"
+        if not any(arg.startswith("-") for arg in args):
+            search_term = args[0]
+            names = self.image.names
+            if "/" in search_term:
+                records = [record for record, path in enumerate(names.paths)
+                           if search_term in path + ("/" if names.is_dir[record] else "")]
+            else:
+                records = names.search_components(search_term)
+            matches = [names.paths[record] + ("/" if names.is_dir[record] else "") for record in records]
+            matches.extend(name for name in self.pending if search_term in name)
+            return "\n".join(matches) if matches else f"No files or directories found matching '{search_term}'"
+
+        if args[0].startswith("-"):
+            start_arg, options = ".", args
+        else:
+            start_arg, options = args[0], args[1:]
+        name_glob = regex = kind = max_depth = None
+        for option, value in zip(options[::2], options[1::2] + [None]):
+            if value is None:
+                return f"Error: find: missing argument to '{option}'"
+            if option == "-name":
+                name_glob = value
+            elif option == "-type" and value in ("f", "d"):
+                kind = value
+            elif option == "-type":
+                return f"Error: find: unknown type '{value}'"
+            elif option == "-maxdepth":
+                try:
+                    max_depth = int(value)
+                except ValueError:
+                    return f"Error: find: invalid depth '{value}'"
+            elif option == "-regex":
+                try:
+                    regex = re.compile(value)
+                except re.error as e:
+                    return f"Error: find: invalid regex: {e}"
+            else:
+                return f"Error: find: unknown predicate '{option}'"
+
+        start = self._resolve(start_arg)
+        if self.index.get_dir(start) is None and not self.index.is_file(start):
+            return f"No such file or directory: {start_arg}"
+        base_depth = start.count("/") + 1 if start else 0
+
+        def matches(path, is_dir):
+            if kind is not None and is_dir != (kind == "d"):
+                return False
+            if max_depth is not None and path.count("/") + 1 - base_depth > max_depth:
+                return False
+            if name_glob is not None and not fnmatch.fnmatchcase(NameIndex.basename(path), name_glob):
+                return False
+            return regex is None or regex.fullmatch(path) is not None
+
+        names = self.image.names
+        output = []
+        if start and matches(start, self.index.get_dir(start) is not None):
+            output.append(start)
+        if start in names.dir_ids or not start:
+            first, end = names.subtree(start)
+            candidates = self._find_candidates(names, name_glob, regex)
+            if candidates is None:
+                candidates = range(first, end)
+            output.extend(names.paths[record] for record in candidates
+                          if first <= record < end and matches(names.paths[record], names.is_dir[record]))
+        prefix = start + "/" if start else ""
+        output.extend(name.rstrip("/") for name in self.pending
+                      if name != prefix and name.startswith(prefix) and matches(name.rstrip("/"), name.endswith("/")))
+        return "\n".join(output)
+
+    @staticmethod
+    def _find_candidates(names, name_glob, regex):
+        if name_glob is not None:
+            if not any(char in name_glob for char in "*?["):
+                return names.basenames.get(name_glob, [])
+            literal = max(re.split(r"\*|\?|\[[^\]]*\]?", name_glob), key=len)
+            return names.search_names(literal) if len(literal) >= 3 else None
+        if regex is not None and not any(char in regex.pattern for char in "|()"):
+            pattern = re.sub(r"\{[^}]*\}", "*", re.sub(r"\[(?:\\.|[^\]])*\]", ".", regex.pattern))
+            runs = re.findall(r"(?:\\.|[^.^$*+?{}\[\]\\])+(?![*?{])", pattern)
+            literals = [run.replace("\\", "") for run in runs if not re.search(r"\\[a-zA-Z0-9]", run)]
+            literal = max(literals, key=len, default="")
+            if len(literal) >= 3 and "/" not in literal:
+                return names.search_components(literal)
+        return None
 
     def tail(self, args):
         if not args:
             return "Error: tail command requires a file path"
 
-        lines = 10
+        count = 10
+        by_bytes = False
         path = None
+        flag = "-n"
 
         try:
-            if "-n" in args:
-                n_index = args.index("-n")
-                lines = int(args[n_index + 1])
-                path = args[n_index + 2] if len(args) > n_index + 2 else None
+            if "-n" in args or "-c" in args:
+                flag = "-n" if "-n" in args else "-c"
+                by_bytes = flag == "-c"
+                flag_index = args.index(flag)
+                count = int(args[flag_index + 1])
+                path = args[flag_index + 2] if len(args) > flag_index + 2 else None
             else:
                 path = args[0]
         except (ValueError, IndexError):
-            return "Error: invalid usage of -n"
+            return f"Error: invalid usage of {flag}"
 
-        if path not in self.archive.namelist():
+        name = self._resolve(path) if path else ""
+        if not self.index.is_file(name):
             return f"No such file: {path}"
 
+        if count <= 0:
+            return ""
+
+        info = self._info(name)
+        try:
+            if name not in self.pending and info.compress_type == zipfile.ZIP_STORED and not info.flag_bits & 0x1:
+                content = self._tail_stored(info, count, by_bytes)
+            else:
+                content = self._tail_stream(info, count, by_bytes)
+            if by_bytes:
+                return content.decode('utf-8', errors='replace')
+            return content.decode('utf-8')
+        except Exception as e:
+            return f"Error: {str(e)}"
+
+    def _tail_stored(self, info, count, by_bytes):
+        with open(self.zip_path, 'rb') as raw:
+            start = self.image.data_offset(raw, info)
+            end = start + info.file_size
+            if by_bytes:
+                raw.seek(max(start, end - count))
+                return raw.read(end - raw.tell())
+
+            blocks = deque()
+            newlines = 0
+            position = end
+            while position > start and newlines <= count:
+                size = min(self.TAIL_BLOCK_SIZE, position - start)
+                position -= size
+                raw.seek(position)
+                block = raw.read(size)
+                newlines += block.count(b"\n")
+                blocks.appendleft(block)
+            # Строки делятся только по b"\n", как в _tail_stream
+            *complete, partial = b"".join(blocks).split(b"\n")
+            lines = [line + b"\n" for line in complete]
+            if partial:
+                lines.append(partial)
+            return b"".join(lines[-count:] if count else [])
+
+    def _tail_stream(self, info, count, by_bytes):
+        with self._open_member(info) as f:
+            if by_bytes:
+                tail = bytearray()
+                while chunk := f.read(self.TAIL_BLOCK_SIZE):
+                    tail += chunk
+                    del tail[:-count]
+                return bytes(tail)
+
+            lines = deque(maxlen=count)
+            partial = b""
+            while chunk := f.read(self.TAIL_BLOCK_SIZE):
+                *complete, partial = (partial + chunk).split(b"\n")
+                lines.extend(line + b"\n" for line in complete)
+            if partial:
+                lines.append(partial)
+            return b"".join(lines)
+
+    def grep(self, args):
+        flags = {arg for arg in args if arg in ("-r", "-c", "-i")}
+        operands = [arg for arg in args if arg not in flags]
+        if len(operands) < 2:
+            return "Error: grep command requires a pattern and a path"
+
+        try:
+            pattern = re.compile(operands[0], re.IGNORECASE if "-i" in flags else 0)
+        except re.error as e:
+            return f"Error: invalid pattern: {e}"
+
+        names, output = self._collect_files(operands[1:], "-r" in flags)
+        count_only = "-c" in flags
+        with_names = "-r" in flags or len(operands) > 2
+
+        def search(name):
+            matches = []
+            with self._open_member(self._info(name)) as f:
+                for line in io.TextIOWrapper(f, encoding='utf-8', errors='replace', newline=''):
+                    if pattern.search(line):
+                        matches.append(line.rstrip("\r\n"))
+            return len(matches) if count_only else matches
+
+        try:
+            for name, matches in self._map_members(names, search):
+                if count_only:
+                    output.append(f"{name}:{matches}" if with_names else str(matches))
+                else:
+                    output.extend(f"{name}:{line}" if with_names else line for line in matches)
+        except Exception as e:
+            return f"Error: {str(e)}"
+        return "\n".join(output)
+
+    def cat(self, args):
+        if not args:
+            return "Error: cat command requires a file path"
+
+        def read(name):
+            with self._open_member(self._info(name)) as f:
+                return f.read().decode('utf-8', errors='replace')
+
+        names, errors = self._collect_files(args, False)
+        try:
+            contents = "".join(content for _, content in self._map_members(names, read))
+        except Exception as e:
+            return f"Error: {str(e)}"
+        return "\n".join(errors + ([contents] if contents else []))
+
+    def wc(self, args):
+        flags = [arg for arg in args if arg in ("-l", "-w", "-c")]
+        paths = [arg for arg in args if arg not in flags]
+        if not paths:
+            return "Error: wc command requires a file path"
+        columns = [column for column, flag in enumerate(("-l", "-w", "-c")) if flag in flags] or [0, 1, 2]
+
+        def count(name):
+            lines = words = size = 0
+            in_word = False
+            with self._open_member(self._info(name)) as f:
+                while chunk := f.read(self.READ_BLOCK_SIZE):
+                    size += len(chunk)
+                    lines += chunk.count(b"\n")
+                    parts = chunk.split()
+                    words += len(parts)
+                    if parts and in_word and not chunk[:1].isspace():
+                        words -= 1
+                    in_word = not chunk[-1:].isspace()
+            return lines, words, size
+
+        names, output = self._collect_files(paths, False)
+        total = [0, 0, 0]
         try:
-            with self.archive.open(path) as f:
-                lines_content = f.readlines()[-lines:]
-            return ''.join(line.decode('utf-8') for line in lines_content)
+            for name, counts in self._map_members(names, count):
+                total = [a + b for a, b in zip(total, counts)]
+                output.append(" ".join(str(counts[column]) for column in columns) + f" {name}")
         except Exception as e:
             return f"Error: {str(e)}"
+        if len(names) > 1:
+            output.append(" ".join(str(total[column]) for column in columns) + " total")
+        return "\n".join(output)
+
+    def _collect_files(self, paths, recursive):
+        names = []
+        errors = []
+        for path in paths:
+            name = self._resolve(path)
+            if self.index.is_file(name):
+                names.append(name)
+            elif self.index.get_dir(name) is None:
+                errors.append(f"No such file: {path}")
+            elif not recursive:
+                errors.append(f"{path}: Is a directory")
+            else:
+                names.extend(sorted(self._walk_files(name), key=self._archive_order))
+        return names, errors
+
+    def _walk_files(self, directory):
+        stack = [directory]
+        while stack:
+            current = stack.pop()
+            for name, child in (self.index.get_dir(current) or {}).items():
+                path = f"{current}/{name}" if current else name
+                if child is None:
+                    yield path
+                else:
+                    stack.append(path)
+
+    def _archive_order(self, name):
+        if name in self.pending:
+            return 1, 0, name
+        return 0, self.entries[name].header_offset, name
+
+    def _map_members(self, names, func):
+        executor = self.image.executor
+        window = deque()
+        for name in names:
+            window.append((name, executor.submit(func, name)))
+            if len(window) >= self.READ_WINDOW:
+                name, future = window.popleft()
+                yield name, future.result()
+        while window:
+            name, future = window.popleft()
+            yield name, future.result()
+
+    def cache_stats(self):
+        if self.image.cache is None:
+            return "Content cache is disabled"
+        return " ".join(f"{key}={value}" for key, value in self.image.cache.stats().items())
 
     def exit(self):
+        if self.persistent:
+            self.sync()
         return "Exiting shell..."
 
     def get_current_path(self):
         return self.cwd
 
-def main():
-    if len(sys.argv) < 5:
-        print("Usage: python shell_emulator.py user localhost vfs.zip log.csv [script.sh]")
-        return
+    @staticmethod
+    def _format_mtime(info):
+        if info is None:
+            return "-"
+        year, month, day, hour, minute, _ = info.date_time
+        return f"{year:04d}-{month:02d}-{day:02d} {hour:02d}:{minute:02d}"
 
-    user = sys.argv[1]
-    zip_path = sys.argv[3]
-    log_file = sys.argv[4]
-    script_args = sys.argv[5:] if len(sys.argv) > 5 else []
+    def _resolve(self, path):
+        base = "/" if path.startswith("/") else self.cwd
+        return posixpath.normpath(posixpath.join(base, path)).strip("/")
 
-    emulator = ShellEmulator(zip_path, log_file, user)
+def run_batch(emulator, lines, out, chunk_size=1000):
+    outputs = []
+    executed = 0
+    for line in lines:
+        command = line.strip()
+        if not command:
+            continue
+        outputs.append(emulator.run_command(command))
+        executed += 1
+        if len(outputs) >= chunk_size:
+            out.write("\n".join(outputs) + "\n")
+            outputs.clear()
+        if command == "exit":
+            break
+    if outputs:
+        out.write("\n".join(outputs) + "\n")
+    return executed
 
-    if script_args:
-        script_file = script_args[0]
+def run_interactive(emulator, script_file=None):
+    if script_file:
         with open(script_file, 'r') as f:
             for line in f:
                 command = line.strip()
@@ -210,5 +1053,56 @@ def main():
         output = emulator.run_command(command)
         print(output)
 
+def main():
+    parser = argparse.ArgumentParser(usage="python shell_emulator.py user localhost vfs.zip log.csv [script.sh]")
+    parser.add_argument("user")
+    parser.add_argument("host")
+    parser.add_argument("zip_path")
+    parser.add_argument("log_file")
+    parser.add_argument("script", nargs="?")
+    parser.add_argument("--log-buffer", type=int, default=64, help="Число строк лога в буфере")
+    parser.add_argument("--log-interval", type=float, default=1.0, help="Интервал сброса лога в секундах")
+    parser.add_argument("--log-background", action="store_true", help="Писать лог из фонового потока")
+    parser.add_argument("--log-fsync", choices=SessionLogger.FSYNC_POLICIES, default="never",
+                        help="Когда вызывать fsync для лога")
+    parser.add_argument("--log-max-bytes", type=int, default=0, help="Размер лога для ротации (0 — без ротации)")
+    parser.add_argument("--read-only", action="store_true", help="Не записывать изменения в архив")
+    parser.add_argument("--no-index", action="store_true", help="Не использовать файл-индекс рядом с архивом")
+    parser.add_argument("--cache-bytes", type=int, default=0, help="Размер кэша содержимого файлов (0 — без кэша)")
+    parser.add_argument("--batch", action="store_true",
+                        help="Выполнить команды из скрипта (или stdin) без приглашений и выйти")
+    parser.add_argument("--log-timing", action="store_true", help="Добавить в лог столбец с временем команды")
+    parser.add_argument("--stats", help="JSON-файл для статистики времени выполнения команд")
+    parser.add_argument("--profile", action="store_true", help="Вывести гистограмму задержек по командам при выходе")
+    args = parser.parse_args()
+
+    log_options = {
+        "buffer_size": args.log_buffer,
+        "flush_interval": args.log_interval,
+        "background": args.log_background,
+        "fsync": args.log_fsync,
+        "max_bytes": args.log_max_bytes,
+        "timing": args.log_timing,
+    }
+    emulator = ShellEmulator(args.zip_path, args.log_file, args.user, log_options,
+                             persistent=not args.read_only, use_index=not args.no_index,
+                             cache_bytes=args.cache_bytes, collect_stats=bool(args.stats or args.profile))
+
+    if args.batch:
+        if args.script:
+            with open(args.script, 'r') as f:
+                run_batch(emulator, f, sys.stdout)
+        else:
+            run_batch(emulator, sys.stdin, sys.stdout)
+    else:
+        run_interactive(emulator, args.script)
+
+    emulator.close()
+    if args.stats:
+        with open(args.stats, 'w') as f:
+            json.dump(emulator.stats.summary(), f, indent=2)
+    if args.profile:
+        print(emulator.stats.histogram(), file=sys.stderr)
+
 if __name__ == "__main__":
     main()
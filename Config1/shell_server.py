@@ -0,0 +1,223 @@
+import asyncio
+import argparse
+import itertools
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from shell_emulator import ShellEmulator, VfsImage
+
+
+class ShellServer:
+    """Сервер сеансов эмулятора: один разобранный образ ВФС на все подключения."""
+
+    def __init__(self, zip_path, log_dir, log_options=None, max_workers=None, cache_bytes=0):
+        self.image = VfsImage(zip_path, cache_bytes=cache_bytes)
+        self.log_dir = log_dir
+        self.log_options = log_options
+        self.executor = ThreadPoolExecutor(max_workers)
+        self.session_ids = itertools.count(1)
+        self.sessions = {}
+        self.server = None
+        os.makedirs(log_dir, exist_ok=True)
+
+    def open_session(self, user):
+        session_id = next(self.session_ids)
+        safe_user = re.sub(r"[^A-Za-z0-9_.-]", "_", user) or "user"
+        log_file = os.path.join(self.log_dir, f"session-{session_id}-{safe_user}.csv")
+        emulator = ShellEmulator(self.image.zip_path, log_file, user, self.log_options,
+                                 persistent=False, image=self.image)
+        self.sessions[session_id] = emulator
+        return session_id, emulator
+
+    async def handle(self, reader, writer):
+        loop = asyncio.get_running_loop()
+        session_id = emulator = None
+        try:
+            hello = await reader.readline()
+            if not hello:
+                return
+            user = str(json.loads(hello).get("user") or "user")
+            session_id, emulator = self.open_session(user)
+            await self._send(writer, {"session": session_id, "cwd": emulator.get_current_path()})
+
+            while line := await reader.readline():
+                command = str(json.loads(line).get("command", "")).strip()
+                output = await loop.run_in_executor(self.executor, emulator.run_command, command)
+                await self._send(writer, {"output": output, "cwd": emulator.get_current_path()})
+                if command == "exit":
+                    break
+        except (ValueError, AttributeError, ConnectionError):
+            pass
+        finally:
+            if emulator is not None:
+                del self.sessions[session_id]
+                await loop.run_in_executor(self.executor, emulator.close)
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    @staticmethod
+    async def _send(writer, message):
+        writer.write(json.dumps(message).encode() + b"\n")
+        await writer.drain()
+
+    async def start(self, host="127.0.0.1", port=8022, unix_path=None):
+        if unix_path:
+            self.server = await asyncio.start_unix_server(self.handle, path=unix_path)
+        else:
+            self.server = await asyncio.start_server(self.handle, host, port)
+        return self.server
+
+    async def close(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        self.executor.shutdown()
+        self.image.close()
+
+
+class ShellClient:
+    """Клиент сервера эмулятора: JSON-строки поверх TCP или Unix-сокета."""
+
+    def __init__(self, reader, writer, session_id, cwd):
+        self.reader = reader
+        self.writer = writer
+        self.session_id = session_id
+        self.cwd = cwd
+
+    @classmethod
+    async def connect(cls, user, host="127.0.0.1", port=8022, unix_path=None):
+        if unix_path:
+            reader, writer = await asyncio.open_unix_connection(unix_path)
+        else:
+            reader, writer = await asyncio.open_connection(host, port)
+        writer.write(json.dumps({"user": user}).encode() + b"\n")
+        await writer.drain()
+        hello = json.loads(await reader.readline())
+        return cls(reader, writer, hello["session"], hello["cwd"])
+
+    async def run(self, command):
+        self.writer.write(json.dumps({"command": command}).encode() + b"\n")
+        await self.writer.drain()
+        line = await self.reader.readline()
+        if not line:
+            raise ConnectionError("Server closed the connection")
+        reply = json.loads(line)
+        self.cwd = reply["cwd"]
+        return reply["output"]
+
+    async def close(self):
+        self.writer.close()
+        try:
+            await self.writer.wait_closed()
+        except ConnectionError:
+            pass
+
+
+async def load_test(commands, sessions, host="127.0.0.1", port=8022, unix_path=None, user="load"):
+    latencies = []
+
+    async def session(number):
+        client = await ShellClient.connect(f"{user}{number}", host, port, unix_path)
+        try:
+            for command in commands:
+                started = time.perf_counter()
+                await client.run(command)
+                latencies.append(time.perf_counter() - started)
+        finally:
+            await client.close()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(session(number) for number in range(sessions)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    total = len(latencies)
+    return {
+        "sessions": sessions,
+        "commands": total,
+        "seconds": elapsed,
+        "commands_per_second": total / elapsed if elapsed else 0.0,
+        "p50_ms": latencies[total // 2] * 1000 if total else 0.0,
+        "p95_ms": latencies[min(total - 1, total * 95 // 100)] * 1000 if total else 0.0,
+    }
+
+
+async def interactive_client(user, host, port, unix_path):
+    client = await ShellClient.connect(user, host, port, unix_path)
+    loop = asyncio.get_running_loop()
+    try:
+        while True:
+            try:
+                command = (await loop.run_in_executor(None, input, f"vfs{client.cwd} $ ")).strip()
+            except EOFError:
+                command = "exit"
+            print(await client.run(command))
+            if command == "exit":
+                break
+    finally:
+        await client.close()
+
+
+async def serve(args):
+    log_options = {"background": args.log_background}
+    server = ShellServer(args.zip_path, args.log_dir, log_options, args.workers, args.cache_bytes)
+    listener = await server.start(args.host, args.port, args.unix)
+    addresses = ", ".join(str(sock.getsockname()) for sock in listener.sockets)
+    print(f"Serving {args.zip_path} on {addresses}")
+    try:
+        await listener.serve_forever()
+    finally:
+        await server.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Сервер сеансов эмулятора оболочки.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8022)
+    parser.add_argument("--unix", help="Путь к Unix-сокету вместо TCP")
+    subparsers = parser.add_subparsers(dest="mode", required=True)
+
+    serve_parser = subparsers.add_parser("serve", help="Запустить сервер")
+    serve_parser.add_argument("zip_path")
+    serve_parser.add_argument("--log-dir", default="sessions", help="Каталог для логов сеансов")
+    serve_parser.add_argument("--log-background", action="store_true")
+    serve_parser.add_argument("--workers", type=int, help="Число потоков для выполнения команд")
+    serve_parser.add_argument("--cache-bytes", type=int, default=0, help="Размер общего кэша содержимого файлов")
+
+    client_parser = subparsers.add_parser("client", help="Интерактивный клиент")
+    client_parser.add_argument("--user", default="user")
+
+    load_parser = subparsers.add_parser("load", help="Нагрузочный тест")
+    load_parser.add_argument("--sessions", type=int, default=10)
+    load_parser.add_argument("--repeat", type=int, default=100)
+    load_parser.add_argument("--script", help="Файл с командами для каждого сеанса")
+
+    args = parser.parse_args()
+
+    try:
+        if args.mode == "serve":
+            asyncio.run(serve(args))
+        elif args.mode == "client":
+            asyncio.run(interactive_client(args.user, args.host, args.port, args.unix))
+        else:
+            if args.script:
+                with open(args.script, 'r') as f:
+                    commands = [line.strip() for line in f if line.strip()]
+            else:
+                commands = ["ls", "ls -l", "cd /", "find txt"]
+            stats = asyncio.run(load_test(commands * args.repeat, args.sessions,
+                                          args.host, args.port, args.unix))
+            json.dump(stats, sys.stdout, indent=2)
+            print()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+import unittest
+import os
+import zipfile
+from tempfile import TemporaryDirectory
+from benchmark import generate_archive, run_benchmarks, directory_for
+
+
+class TestBenchmark(unittest.TestCase):
+    def test_generate_archive(self):
+        """Тест на генерацию синтетического архива заданной формы"""
+        with TemporaryDirectory() as work_dir:
+            zip_path = os.path.join(work_dir, "vfs.zip")
+            info = generate_archive(zip_path, 25, depth=2, fanout=3, files_per_dir=5, file_size=100,
+                                    tail_size=1000, compression=zipfile.ZIP_STORED)
+            with zipfile.ZipFile(zip_path) as archive:
+                names = archive.namelist()
+            self.assertEqual(len(names), 26)
+            self.assertIn(f"{directory_for(4, 2, 3)}/file24.txt", names)
+            self.assertEqual(info["compression"], "stored")
+
+    def test_run_benchmarks(self):
+        """Тест на прогон всех замеров на маленьком архиве"""
+        with TemporaryDirectory() as work_dir:
+            zip_path = os.path.join(work_dir, "vfs.zip")
+            generate_archive(zip_path, 50, depth=2, fanout=3, files_per_dir=5, tail_size=1000)
+            results = run_benchmarks(zip_path, work_dir, 2, 3, iterations=2)
+            for name in ("startup_cold", "startup_warm", "ls_root", "ls_l_leaf", "cd",
+                         "find_name", "mkdir", "tail"):
+                self.assertIn(name, results)
+                self.assertGreaterEqual(results[name]["peak_kib"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,8 +1,13 @@
 import unittest
+import io
 import os
+import csv
+import threading
 import zipfile
 from tempfile import TemporaryDirectory
-from shell_emulator import ShellEmulator  # Импортируем эмулятор
+from shell_emulator import (  # Импортируем эмулятор
+    ShellEmulator, DirectoryIndex, SessionLogger, SidecarEntries, VfsImage, ContentCache, CommandStats, run_batch
+)
 
 
 class TestShellEmulator(unittest.TestCase):
@@ -15,6 +20,12 @@ class TestShellEmulator(unittest.TestCase):
         with zipfile.ZipFile(cls.zip_path, 'w') as archive:
             archive.writestr('file1.txt', 'Hello, world!')
             archive.writestr('dir1/file2.txt', 'Sample content')
+            cls.log_lines = [f"line {i}\n" for i in range(1000)]
+            archive.writestr('logs/stored.log', ''.join(cls.log_lines))
+            archive.writestr('logs/deflated.log', ''.join(cls.log_lines),
+                             compress_type=zipfile.ZIP_DEFLATED)
+            archive.writestr('crlf/stored.dat', 'a\nx\ry\rz\nb\rc')
+            archive.writestr('crlf/deflated.dat', 'a\nx\ry\rz\nb\rc', compress_type=zipfile.ZIP_DEFLATED)
 
         cls.log_file = os.path.join(cls.temp_zip.name, "log.csv")
         cls.user = "test_user"
@@ -45,6 +56,12 @@ class TestShellEmulator(unittest.TestCase):
         self.assertIn('file1.txt', result)
         self.assertIn('dir1', result)
 
+    def test_ls_detailed_metadata(self):
+        """Тест на вывод размера и времени изменения файла в ls -l"""
+        info = self.emulator.entries["file1.txt"]
+        result = self.emulator.run_command("ls -l")
+        self.assertIn(f"-rw-r--r-- 13 {self.emulator._format_mtime(info)} file1.txt", result)
+
     # Тесты для команды cd
     def test_cd_success(self):
         """Тест на команду cd для перехода в директорию"""
@@ -68,6 +85,25 @@ class TestShellEmulator(unittest.TestCase):
         result = self.emulator.run_command("mkdir existing_dir")
         self.assertIn("Directory 'existing_dir' already exists", result)
 
+    def test_mkdir_sync(self):
+        """Тест на запись отложенных изменений в архив командой sync"""
+        self.emulator.run_command("mkdir synced_dir")
+        with zipfile.ZipFile(self.zip_path) as archive:
+            self.assertNotIn("synced_dir/", archive.namelist())
+        self.assertEqual(self.emulator.run_command("sync"), "Synced 1 change(s)")
+        with zipfile.ZipFile(self.zip_path) as archive:
+            self.assertIn("synced_dir/", archive.namelist())
+        self.assertIn("synced_dir", self.emulator.run_command("ls"))
+
+    def test_mkdir_read_only(self):
+        """Тест на то, что в режиме только для чтения архив не меняется"""
+        emulator = ShellEmulator(self.zip_path, self.log_file, self.user, persistent=False)
+        emulator.run_command("mkdir memory_only")
+        self.assertIn("memory_only", emulator.run_command("ls"))
+        emulator.close()
+        with zipfile.ZipFile(self.zip_path) as archive:
+            self.assertNotIn("memory_only/", archive.namelist())
+
     # Тесты для команды find
     def test_find_success(self):
         """Тест на команду find для поиска файла"""
@@ -79,6 +115,30 @@ class TestShellEmulator(unittest.TestCase):
         result = self.emulator.run_command("find non_existing_file")
         self.assertEqual(result, "No files or directories found matching 'non_existing_file'")
 
+    def test_find_name_and_type(self):
+        """Тест на find с фильтрами -name, -type и -maxdepth"""
+        self.assertEqual(self.emulator.run_command("find -name *.log").split("\n"),
+                         ["logs/deflated.log", "logs/stored.log"])
+        self.assertEqual(self.emulator.run_command("find / -name file2.txt"), "dir1/file2.txt")
+        self.assertEqual(self.emulator.run_command("find logs -type f -maxdepth 1").split("\n"),
+                         ["logs/deflated.log", "logs/stored.log"])
+        top_dirs = self.emulator.run_command("find . -type d -maxdepth 1").split("\n")
+        self.assertIn("dir1", top_dirs)
+        self.assertIn("logs", top_dirs)
+        self.assertFalse(any("/" in path for path in top_dirs))
+        # Каталог, созданный в этой сессии, выводится один раз
+        self.emulator.run_command("mkdir newdir")
+        self.emulator.run_command("mkdir newdir/sub")
+        self.assertEqual(self.emulator.run_command("find newdir -type d").split("\n"), ["newdir", "newdir/sub"])
+
+    def test_find_regex_and_errors(self):
+        """Тест на find с -regex, на подстроку в имени каталога и на ошибки"""
+        self.assertEqual(self.emulator.run_command(r"find -regex .*/file[0-9]\.txt"), "dir1/file2.txt")
+        self.assertIn("dir1/file2.txt", self.emulator.run_command("find ir1").split("\n"))
+        self.assertEqual(self.emulator.run_command("find -type x"), "Error: find: unknown type 'x'")
+        self.assertEqual(self.emulator.run_command("find missing -name a"),
+                         "No such file or directory: missing")
+
     # Тесты для команды tail
     def test_tail_success(self):
         """Тест на команду tail для вывода последних строк файла"""
@@ -90,6 +150,204 @@ class TestShellEmulator(unittest.TestCase):
         result = self.emulator.run_command("tail non_existing_file.txt")
         self.assertEqual(result, "No such file: non_existing_file.txt")
 
+    # Тесты для команд grep, cat и wc
+    def test_grep_recursive(self):
+        """Тест на рекурсивный grep по содержимому архива в порядке записей"""
+        result = self.emulator.run_command("grep -r line.99[09]$ logs")
+        self.assertEqual(result.split("\n"), [
+            "logs/stored.log:line 990", "logs/stored.log:line 999",
+            "logs/deflated.log:line 990", "logs/deflated.log:line 999",
+        ])
+        self.assertEqual(self.emulator.run_command("grep -c line logs/deflated.log"), "1000")
+
+    def test_grep_directory_without_r(self):
+        """Тест на grep по директории без ключа -r"""
+        result = self.emulator.run_command("grep line logs")
+        self.assertEqual(result, "logs: Is a directory")
+
+    def test_cat(self):
+        """Тест на вывод содержимого нескольких файлов"""
+        result = self.emulator.run_command("cat file1.txt dir1/file2.txt")
+        self.assertEqual(result, "Hello, world!Sample content")
+        self.assertEqual(self.emulator.run_command("cat missing.txt"), "No such file: missing.txt")
+
+    def test_wc(self):
+        """Тест на подсчет строк, слов и байт"""
+        self.emulator.READ_BLOCK_SIZE = 5
+        size = len(''.join(self.log_lines))
+        result = self.emulator.run_command("wc logs/stored.log logs/deflated.log")
+        self.assertEqual(result.split("\n"), [
+            f"1000 2000 {size} logs/stored.log",
+            f"1000 2000 {size} logs/deflated.log",
+            f"2000 4000 {size * 2} total",
+        ])
+        self.assertEqual(self.emulator.run_command("wc -w file1.txt"), "2 file1.txt")
+
+    # Тесты для кэша содержимого
+    def test_content_cache_hits(self):
+        """Тест на повторный tail из кэша без повторной распаковки"""
+        emulator = ShellEmulator(self.zip_path, self.log_file, self.user, cache_bytes=1 << 20)
+        first = emulator.run_command("tail -n 3 logs/deflated.log")
+        second = emulator.run_command("tail -n 3 logs/deflated.log")
+        self.assertEqual(first, second)
+        self.assertEqual((emulator.image.cache.hits, emulator.image.cache.misses), (1, 1))
+        self.assertIn("hits=1 misses=1", emulator.run_command("cache"))
+        emulator.close()
+
+    def test_content_cache_eviction(self):
+        """Тест на вытеснение давно не использованных записей по бюджету байт"""
+        cache = ContentCache(10)
+        cache.put(("a", 1), b"12345")
+        cache.put(("b", 2), b"12345")
+        cache.get(("a", 1))
+        cache.put(("c", 3), b"123")
+        self.assertIsNone(cache.get(("b", 2)))
+        self.assertEqual(cache.get(("a", 1)), b"12345")
+        cache.put(("d", 4), b"12345678901")
+        self.assertEqual(cache.stats()["bytes"], 8)
+
+    # Тесты для индекса каталогов
+    def test_index_lookup(self):
+        """Тест на поиск узлов в индексе каталогов"""
+        index = DirectoryIndex(["a/b/c.txt", "a/d/", "e.txt"])
+        self.assertEqual(sorted(index.get_dir("a")), ["b", "d"])
+        self.assertTrue(index.is_file("a/b/c.txt"))
+        self.assertFalse(index.is_file("a/b"))
+        self.assertIsNone(index.get_dir("e.txt"))
+        self.assertFalse(index.exists("a/x"))
+
+    def test_mkdir_updates_index(self):
+        """Тест на то, что новая директория сразу видна в ls и cd"""
+        self.emulator.run_command("mkdir dir1/nested")
+        self.emulator.run_command("cd dir1")
+        self.assertIn("nested", self.emulator.run_command("ls"))
+        self.assertEqual(self.emulator.run_command("cd nested"), "")
+        self.assertEqual(self.emulator.run_command("cd /"), "")
+        self.assertEqual(self.emulator.get_current_path(), "/")
+
+    def test_tail_streaming(self):
+        """Тест на потоковый tail для несжатых и сжатых файлов"""
+        self.emulator.TAIL_BLOCK_SIZE = 7
+        expected = ''.join(self.log_lines[-25:])
+        for path in ("logs/stored.log", "logs/deflated.log"):
+            self.assertEqual(self.emulator.run_command(f"tail -n 25 {path}"), expected)
+            self.assertEqual(self.emulator.run_command(f"tail -c 8 {path}"), "line 999\n"[-8:])
+
+    def test_tail_splits_only_on_newline(self):
+        """Тест на то, что tail делит строки только по \\n для несжатых и сжатых файлов"""
+        for path in ("crlf/stored.dat", "crlf/deflated.dat"):
+            self.assertEqual(self.emulator.run_command(f"tail -n 1 {path}"), "b\rc")
+            self.assertEqual(self.emulator.run_command(f"tail -n 2 {path}"), "x\ry\rz\nb\rc")
+
+    def test_tail_invalid_count(self):
+        """Тест на некорректное значение -c"""
+        result = self.emulator.run_command("tail -c x logs/stored.log")
+        self.assertEqual(result, "Error: invalid usage of -c")
+
+    # Тесты для файла-индекса архива
+    def test_sidecar_index_reused(self):
+        """Тест на загрузку метаданных из файла-индекса при повторном открытии"""
+        VfsImage(self.zip_path).close()
+        image = VfsImage(self.zip_path)
+        self.assertIsInstance(image.entries, SidecarEntries)
+        info = image.entries["logs/deflated.log"]
+        self.assertEqual(info.compress_type, zipfile.ZIP_DEFLATED)
+        with image.open(info) as f:
+            self.assertEqual(f.read().decode(), ''.join(self.log_lines))
+        image.close()
+
+    def test_sidecar_index_stale(self):
+        """Тест на перестроение устаревшего файла-индекса"""
+        zip_path = os.path.join(self.temp_zip.name, "stale.zip")
+        with zipfile.ZipFile(zip_path, 'w') as archive:
+            archive.writestr('a.txt', 'a')
+        VfsImage(zip_path).close()
+        with zipfile.ZipFile(zip_path, 'a') as archive:
+            archive.writestr('b.txt', 'b')
+        self.assertIsNone(SidecarEntries.load(zip_path + ".idx", zip_path))
+        image = VfsImage(zip_path)
+        self.assertIn('b.txt', image.entries)
+        image.close()
+        image = VfsImage(zip_path)
+        self.assertIsInstance(image.entries, SidecarEntries)
+        self.assertEqual(sorted(image.entries), ['a.txt', 'b.txt'])
+        image.close()
+
+    # Тесты для журнала сеанса
+    def test_logger_batches_rows(self):
+        """Тест на то, что журнал пишется пачками и сбрасывается при exit"""
+        log_path = os.path.join(self.temp_zip.name, "batched.csv")
+        emulator = ShellEmulator(self.zip_path, log_path, self.user,
+                                 {"buffer_size": 100, "flush_interval": 60})
+        emulator.run_command("ls")
+        with open(log_path, newline='') as f:
+            self.assertEqual(len(list(csv.reader(f))), 1)
+        emulator.run_command("exit")
+        with open(log_path, newline='') as f:
+            rows = list(csv.reader(f))
+        self.assertEqual([row[3] for row in rows[1:]], ["ls", "exit"])
+        emulator.close()
+
+    def test_logger_rotation(self):
+        """Тест на ротацию журнала по размеру из фонового потока"""
+        log_path = os.path.join(self.temp_zip.name, "rotated.csv")
+        logger = SessionLogger(log_path, self.user, buffer_size=1, background=True,
+                               fsync="flush", max_bytes=10, backup_count=2)
+        for i in range(3):
+            logger.log(f"cmd{i}", "ok")
+            logger.flush()
+        logger.close()
+        self.assertTrue(os.path.exists(log_path + ".1"))
+        self.assertTrue(os.path.exists(log_path + ".2"))
+        self.assertFalse(os.path.exists(log_path + ".3"))
+
+    def test_logger_background_keeps_all_rows(self):
+        """Тест на то, что строки не теряются при записи из нескольких потоков в фоновом режиме"""
+        log_path = os.path.join(self.temp_zip.name, "concurrent.csv")
+        logger = SessionLogger(log_path, self.user, buffer_size=2, flush_interval=0.0, background=True)
+
+        def worker(number):
+            for i in range(500):
+                logger.log(f"cmd{number}-{i}", "ok")
+
+        threads = [threading.Thread(target=worker, args=(number,)) for number in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        logger.close()
+        with open(log_path, newline='') as f:
+            rows = list(csv.reader(f))
+        self.assertEqual(len(rows), 1 + 8 * 500)
+
+    # Тесты для пакетного режима
+    def test_run_batch(self):
+        """Тест на пакетное выполнение команд с замером времени в логе"""
+        log_path = os.path.join(self.temp_zip.name, "batch.csv")
+        emulator = ShellEmulator(self.zip_path, log_path, self.user, {"timing": True}, collect_stats=True)
+        out = io.StringIO()
+        script = "cd dir1\n\ntail -n 1 /logs/stored.log\nexit\nls\n"
+        executed = run_batch(emulator, io.StringIO(script), out, chunk_size=2)
+        self.assertEqual(executed, 3)
+        self.assertEqual(out.getvalue(), "\nline 999\n\nExiting shell...\n")
+        self.assertEqual(emulator.stats.summary()["tail"]["count"], 1)
+        emulator.close()
+        with open(log_path, newline='') as f:
+            rows = list(csv.reader(f))
+        self.assertEqual(rows[0][-1], "Duration (ms)")
+        self.assertEqual(len(rows), 4)
+        self.assertGreaterEqual(float(rows[1][-1]), 0.0)
+
+    def test_command_stats_histogram(self):
+        """Тест на гистограмму задержек по типам команд"""
+        stats = CommandStats()
+        for seconds in (0.000001, 0.0005, 0.0006, 2.0):
+            stats.add("ls", seconds)
+        histogram = stats.histogram()
+        self.assertIn("ls (4 commands)", histogram)
+        self.assertIn("<1ms        2", histogram)
+        self.assertEqual(stats.summary()["ls"]["max_ms"], 2000.0)
+
     # Тесты для команды exit
     def test_exit(self):
         """Тест на команду exit для выхода из оболочки"""
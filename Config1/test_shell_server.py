@@ -0,0 +1,50 @@
+import unittest
+import os
+import zipfile
+from tempfile import TemporaryDirectory
+from shell_server import ShellServer, ShellClient, load_test
+
+
+class TestShellServer(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        """Создаем архив и запускаем сервер на свободном порту"""
+        self.temp_dir = TemporaryDirectory()
+        self.zip_path = os.path.join(self.temp_dir.name, "vfs.zip")
+        with zipfile.ZipFile(self.zip_path, 'w') as archive:
+            archive.writestr('file1.txt', 'Hello, world!')
+            archive.writestr('dir1/file2.txt', 'Sample content')
+        self.log_dir = os.path.join(self.temp_dir.name, "sessions")
+        self.server = ShellServer(self.zip_path, self.log_dir)
+        listener = await self.server.start("127.0.0.1", 0)
+        self.port = listener.sockets[0].getsockname()[1]
+
+    async def asyncTearDown(self):
+        """Останавливаем сервер и удаляем временные файлы"""
+        await self.server.close()
+        self.temp_dir.cleanup()
+
+    async def test_sessions_are_isolated(self):
+        """Тест на независимые каталоги и изменения у разных сеансов"""
+        alice = await ShellClient.connect("alice", port=self.port)
+        bob = await ShellClient.connect("bob", port=self.port)
+        await alice.run("cd dir1")
+        await alice.run("mkdir alice_dir")
+        self.assertEqual(alice.cwd, "/dir1")
+        self.assertEqual(bob.cwd, "/")
+        self.assertIn("alice_dir", await alice.run("ls"))
+        await bob.run("cd dir1")
+        self.assertNotIn("alice_dir", await bob.run("ls"))
+        self.assertEqual(await bob.run("exit"), "Exiting shell...")
+        await alice.close()
+        await bob.close()
+        self.assertEqual(len(os.listdir(self.log_dir)), 2)
+
+    async def test_load_test(self):
+        """Тест на нагрузочный прогон нескольких сеансов"""
+        stats = await load_test(["ls", "cd dir1", "ls -l"], 4, port=self.port)
+        self.assertEqual(stats["commands"], 12)
+        self.assertGreater(stats["commands_per_second"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
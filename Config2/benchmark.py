@@ -0,0 +1,281 @@
+import argparse
+import hashlib
+import json
+import os
+import platform
+import random
+import struct
+import subprocess
+import sys
+import time
+import tracemalloc
+import zlib
+from tempfile import TemporaryDirectory
+from tool import (
+    OBJECT_TYPES,
+    clear_object_stores,
+    collect_changes,
+    get_commit_history,
+    read_git_object,
+    write_graph
+)
+
+TYPE_NUMBERS = {name: number for number, name in OBJECT_TYPES.items()}
+
+
+class SyntheticRepository:
+    """Пишет синтетический репозиторий git без git: loose-объекты или один pack-файл с индексом v2."""
+
+    def __init__(self, repo_path, packed=False):
+        self.repo_path = repo_path
+        self.packed = packed
+        self.objects = {}
+        self.git_dir = os.path.join(repo_path, '.git')
+        for directory in ('objects/info', 'objects/pack', 'refs/heads', 'refs/tags'):
+            os.makedirs(os.path.join(self.git_dir, *directory.split('/')), exist_ok=True)
+        with open(os.path.join(self.git_dir, 'HEAD'), 'w') as f:
+            f.write('ref: refs/heads/master\n')
+
+    def write_object(self, object_type, body):
+        raw = f'{object_type} {len(body)}'.encode() + b'\0' + body
+        object_hash = hashlib.sha1(raw).hexdigest()
+        if object_hash in self.objects:
+            return object_hash
+        if self.packed:
+            self.objects[object_hash] = (object_type, body)
+        else:
+            self.objects[object_hash] = None
+            directory = os.path.join(self.git_dir, 'objects', object_hash[:2])
+            os.makedirs(directory, exist_ok=True)
+            with open(os.path.join(directory, object_hash[2:]), 'wb') as f:
+                f.write(zlib.compress(raw, 1))
+        return object_hash
+
+    def write_tree(self, directory):
+        """Записывает дерево каталога; хэши неизменённых поддеревьев берутся из directory['hash']."""
+        if directory['hash'] is None:
+            entries = []
+            for name, value in directory['entries'].items():
+                if isinstance(value, dict):
+                    entries.append((name + '/', b'40000 ' + name.encode(), self.write_tree(value)))
+                else:
+                    entries.append((name, b'100644 ' + name.encode(), value))
+            entries.sort()
+            body = b''.join(header + b'\0' + bytes.fromhex(object_hash) for _, header, object_hash in entries)
+            directory['hash'] = self.write_object('tree', body)
+        return directory['hash']
+
+    def write_pack(self):
+        """Записывает накопленные объекты в pack-файл без дельт и индекс v2."""
+        pack = bytearray(b'PACK' + struct.pack('>II', 2, len(self.objects)))
+        offsets = {}
+        crcs = {}
+        for object_hash, (object_type, body) in self.objects.items():
+            start = len(pack)
+            size = len(body)
+            byte = (TYPE_NUMBERS[object_type] << 4) | (size & 0x0f)
+            size >>= 4
+            header = bytearray()
+            while size:
+                header.append(byte | 0x80)
+                byte = size & 0x7f
+                size >>= 7
+            header.append(byte)
+            entry = bytes(header) + zlib.compress(body, 1)
+            pack += entry
+            offsets[object_hash] = start
+            crcs[object_hash] = zlib.crc32(entry)
+        pack_hash = hashlib.sha1(pack).digest()
+        pack += pack_hash
+
+        names = sorted(offsets)
+        fanout = [0] * 256
+        for object_hash in names:
+            fanout[int(object_hash[:2], 16)] += 1
+        for number in range(1, 256):
+            fanout[number] += fanout[number - 1]
+        index = bytearray(b'\377tOc' + struct.pack('>I', 2))
+        index += struct.pack('>256I', *fanout)
+        index += b''.join(bytes.fromhex(object_hash) for object_hash in names)
+        index += b''.join(struct.pack('>I', crcs[object_hash]) for object_hash in names)
+        index += b''.join(struct.pack('>I', offsets[object_hash]) for object_hash in names)
+        index += pack_hash
+        index += hashlib.sha1(index).digest()
+
+        base = os.path.join(self.git_dir, 'objects', 'pack', f'pack-{pack_hash.hex()}')
+        with open(base + '.pack', 'wb') as f:
+            f.write(pack)
+        with open(base + '.idx', 'wb') as f:
+            f.write(index)
+
+    def set_ref(self, name, object_hash):
+        with open(os.path.join(self.git_dir, *name.split('/')), 'w') as f:
+            f.write(object_hash + '\n')
+
+
+def generate_repository(repo_path, commits, width=10, depth=3, files_per_dir=10, changes_per_commit=3,
+                        packed=False, seed=0):
+    """Создает репозиторий с линейной историей: каждый коммит меняет changes_per_commit случайных файлов."""
+    rng = random.Random(seed)
+    repo = SyntheticRepository(repo_path, packed)
+
+    def make_directory(level):
+        entries = {}
+        if level < depth:
+            for number in range(width):
+                entries[f'd{number}'] = make_directory(level + 1)
+        else:
+            for number in range(files_per_dir):
+                entries[f'f{number}.txt'] = None
+        return {'entries': entries, 'hash': None}
+
+    root = make_directory(0)
+    leaves = []
+
+    def collect_leaves(directory):
+        children = [value for value in directory['entries'].values() if isinstance(value, dict)]
+        if not children:
+            leaves.append(directory)
+        for child in children:
+            collect_leaves(child)
+
+    collect_leaves(root)
+    empty_blob = repo.write_object('blob', b'initial\n')
+    for leaf in leaves:
+        for name in leaf['entries']:
+            leaf['entries'][name] = empty_blob
+
+    parent = None
+    for number in range(commits):
+        if number:
+            for _ in range(changes_per_commit):
+                path = [root]
+                directory = root
+                while True:
+                    children = [value for value in directory['entries'].values() if isinstance(value, dict)]
+                    if not children:
+                        break
+                    directory = rng.choice(children)
+                    path.append(directory)
+                name = rng.choice(sorted(directory['entries']))
+                directory['entries'][name] = repo.write_object('blob', f'{name} changed in {number}\n'.encode())
+                for changed in path:
+                    changed['hash'] = None
+        tree = repo.write_tree(root)
+        lines = [f'tree {tree}'] + ([f'parent {parent}'] if parent else [])
+        lines.append(f'author Bench <bench@example.com> {1600000000 + number} +0000')
+        lines.append(f'committer Bench <bench@example.com> {1600000000 + number} +0000')
+        parent = repo.write_object('commit', ('\n'.join(lines) + f'\n\ncommit {number}\n').encode())
+
+    if packed:
+        repo.write_pack()
+    repo.set_ref('refs/heads/master', parent)
+    repo.set_ref('refs/tags/bench', parent)
+    return {
+        'commits': commits,
+        'width': width,
+        'depth': depth,
+        'files_per_dir': files_per_dir,
+        'files': len(leaves) * files_per_dir,
+        'changes_per_commit': changes_per_commit,
+        'packed': packed,
+        'objects': len(repo.objects),
+        'head': parent,
+    }, list(repo.objects)
+
+
+def measure(func, iterations, setup=None):
+    timings = []
+    for _ in range(iterations):
+        if setup:
+            setup()
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+
+    if setup:
+        setup()
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'iterations': iterations,
+        'mean_ms': sum(timings) / len(timings) * 1000,
+        'p50_ms': timings[len(timings) // 2] * 1000,
+        'min_ms': timings[0] * 1000,
+        'max_ms': timings[-1] * 1000,
+        'peak_kib': peak / 1024,
+    }
+
+
+def run_benchmarks(repo_path, head, object_hashes, work_dir, iterations=5):
+    results = {}
+    output_path = os.path.join(work_dir, 'bench.puml')
+    history = get_commit_history(repo_path, head, details=False)
+    clear_object_stores()
+    changes = collect_changes(repo_path, history)
+
+    results['read_objects'] = measure(lambda: [read_git_object(repo_path, object_hash)
+                                               for object_hash in object_hashes], iterations)
+    results['history'] = measure(lambda: get_commit_history(repo_path, head, details=False), iterations,
+                                 clear_object_stores)
+    results['history_details'] = measure(lambda: get_commit_history(repo_path, head), iterations,
+                                         clear_object_stores)
+    results['build_graph'] = measure(lambda: collect_changes(repo_path, history), iterations, clear_object_stores)
+    results['build_graph_warm'] = measure(lambda: collect_changes(repo_path, history), iterations)
+    results['emit_plantuml'] = measure(lambda: write_graph(changes, output_path), iterations)
+    clear_object_stores()
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк построения графа зависимостей на синтетических репозиториях.")
+    parser.add_argument('--commits', type=int, nargs='+', default=[100, 1000, 10000],
+                        help="Число коммитов (можно несколько)")
+    parser.add_argument('--width', type=int, default=10, help="Число подкаталогов на уровне")
+    parser.add_argument('--depth', type=int, default=3, help="Глубина дерева каталогов")
+    parser.add_argument('--files-per-dir', type=int, default=10, help="Число файлов в каталоге нижнего уровня")
+    parser.add_argument('--changes-per-commit', type=int, default=3, help="Число изменённых файлов в коммите")
+    parser.add_argument('--pack', action='store_true', help="Записать объекты в pack-файл вместо loose-объектов")
+    parser.add_argument('--iterations', type=int, default=5)
+    parser.add_argument('--label', help="Метка прогона (по умолчанию — ревизия git)")
+    parser.add_argument('--output', default='bench_results.json', help="JSON-файл с результатами")
+    args = parser.parse_args()
+
+    report = {
+        'label': args.label or git_revision(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'runs': [],
+    }
+    with TemporaryDirectory() as work_dir:
+        for commits in args.commits:
+            repo_path = os.path.join(work_dir, f'repo_{commits}')
+            started = time.perf_counter()
+            repository, object_hashes = generate_repository(repo_path, commits, args.width, args.depth,
+                                                            args.files_per_dir, args.changes_per_commit, args.pack)
+            repository['generate_seconds'] = time.perf_counter() - started
+            results = run_benchmarks(repo_path, repository['head'], object_hashes, work_dir, args.iterations)
+            report['runs'].append({'repository': repository, 'results': results})
+            for name, result in results.items():
+                print(f"{commits:>9} {name:<17} {result['mean_ms']:10.3f} ms  peak {result['peak_kib']:10.1f} KiB",
+                      file=sys.stderr)
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
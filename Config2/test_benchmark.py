@@ -0,0 +1,45 @@
+import unittest
+import os
+import shutil
+import subprocess
+from tempfile import TemporaryDirectory
+from benchmark import generate_repository, run_benchmarks
+from tool import clear_object_stores, get_commit_history, collect_changes
+
+
+class TestBenchmark(unittest.TestCase):
+    def tearDown(self):
+        clear_object_stores()
+
+    def test_generate_repository(self):
+        """Тест на генерацию loose и packed репозиториев с одинаковой историей"""
+        with TemporaryDirectory() as work_dir:
+            heads = []
+            for packed in (False, True):
+                repo_path = os.path.join(work_dir, f"repo_{packed}")
+                info, object_hashes = generate_repository(repo_path, 20, width=2, depth=2, files_per_dir=3,
+                                                          packed=packed)
+                self.assertEqual(info["files"], 12)
+                history = get_commit_history(repo_path, info["head"])
+                self.assertEqual(len(history), 20)
+                changes = collect_changes(repo_path, history)
+                self.assertTrue(all(changes.values()))
+                heads.append(info["head"])
+                if shutil.which("git"):
+                    subprocess.run(["git", "-C", repo_path, "fsck", "--strict"], check=True, capture_output=True)
+            self.assertEqual(heads[0], heads[1])
+
+    def test_run_benchmarks(self):
+        """Тест на прогон всех замеров на маленьком репозитории"""
+        with TemporaryDirectory() as work_dir:
+            repo_path = os.path.join(work_dir, "repo")
+            info, object_hashes = generate_repository(repo_path, 10, width=2, depth=2, files_per_dir=2)
+            results = run_benchmarks(repo_path, info["head"], object_hashes, work_dir, iterations=2)
+            for name in ("read_objects", "history", "history_details", "build_graph", "build_graph_warm",
+                         "emit_plantuml"):
+                self.assertIn(name, results)
+                self.assertGreaterEqual(results[name]["peak_kib"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,6 +3,11 @@ from unittest.mock import patch, mock_open, MagicMock
 import os
 import zlib
 import sys
+import shutil
+import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from xml.etree import ElementTree
 
 
 sys.path.append(os.path.abspath(os.path.dirname(__file__)))
@@ -15,11 +20,56 @@ from tool import (
     get_commit_history,
     build_dependency_graph,
     group_files_in_packages,
-    generate_plantuml_code
+    generate_plantuml_code,
+    apply_delta,
+    get_packs,
+    get_object_store,
+    clear_object_stores,
+    walk_tree,
+    diff_trees,
+    CommitGraph,
+    GraphCache,
+    list_tags,
+    resolve_tag,
+    output_path_for_tag,
+    collect_changes,
+    write_graph,
+    DependencyGraph,
+    collapse_changes,
+    plantuml_command,
+    PlantUMLRenderer
 )
 
+
+def raw_object(object_type, body):
+    """Формирует сырой объект git с заголовком."""
+    return f"{object_type} {len(body)}".encode() + b"\0" + body
+
+
+def tree_object(*entries):
+    """Формирует двоичный объект дерева из (режим, имя, хэш)."""
+    return raw_object("tree", b"".join(f"{mode} {name}".encode() + b"\0" + bytes.fromhex(object_hash)
+                                       for mode, name, object_hash in entries))
+
+
+def fake_repository():
+    """Объекты небольшого репозитория: коммит c1 с деревом a0 (file1.txt, src/lib/file2.txt)
+    и его потомок c2 с деревом a3, в котором изменён только file1.txt."""
+    return {
+        "c1" * 20: raw_object("commit", f"tree {'a0' * 20}\nauthor A <a@b> 1 +0000\n\nCommit 1\n".encode()),
+        "c2" * 20: raw_object("commit", f"tree {'a3' * 20}\nparent {'c1' * 20}\nauthor A <a@b> 2 +0000\n\nCommit 2\n".encode()),
+        "a3" * 20: tree_object(("100644", "file1.txt", "b3" * 20), ("40000", "src", "a1" * 20)),
+        "a0" * 20: tree_object(("100644", "file1.txt", "b1" * 20), ("40000", "src", "a1" * 20)),
+        "a1" * 20: tree_object(("40000", "lib", "a2" * 20)),
+        "a2" * 20: tree_object(("100644", "file2.txt", "b2" * 20)),
+    }
+
+
 class TestDependencyVisualizer(unittest.TestCase):
 
+    def setUp(self):
+        clear_object_stores()
+
     def test_load_config(self):
         mock_csv_content = "key1,value1\nkey2,value2\n"
         with patch("builtins.open", mock_open(read_data=mock_csv_content)):
@@ -45,6 +95,7 @@ class TestDependencyVisualizer(unittest.TestCase):
             b"tree abcdef1234567890\n"
             b"parent 1234567890abcdef\n"
             b"author John Doe <john@example.com> 1234567890 +0000\n"
+            b"committer Jane Roe <jane@example.com> 1234567999 +0000\n"
             b"\nCommit message here.\n"
         )
         parsed = parse_commit_object(raw_commit)
@@ -53,30 +104,157 @@ class TestDependencyVisualizer(unittest.TestCase):
             "parents": ["1234567890abcdef"],
             "author": "John Doe <john@example.com>",
             "date": 1234567890,
+            "committer": "Jane Roe <jane@example.com>",
+            "committer_date": 1234567999,
             "message": "Commit message here."
         })
 
     @patch("tool.read_git_object")
     def test_get_commit_history(self, mock_read_git_object):
         mock_read_git_object.side_effect = [
-            b"tree abcdef1234567890\nparent 1234567890abcdef\nauthor John Doe <john@example.com> 1234567890 +0000\n\nFirst commit.\n",
-            b"tree abcdef1234567890\nauthor Jane Smith <jane@example.com> 1234560000 +0000\n\nSecond commit.\n",
+            raw_object("commit", b"tree abcdef1234567890\nparent 1234567890abcdef\nauthor John Doe <john@example.com> 1234567890 +0000\n\nFirst commit.\n"),
+            raw_object("commit", b"tree abcdef1234567890\nauthor Jane Smith <jane@example.com> 1234560000 +0000\n\nSecond commit.\n"),
         ]
         history = get_commit_history("/fake/repo", "abcd1234")
         self.assertEqual(len(history), 2)
         self.assertIn("abcd1234", history)
         self.assertIn("1234567890abcdef", history)
 
+    @patch("tool.read_git_object")
+    def test_get_commit_history_follows_merges(self, mock_read_git_object):
+        # m -> (a, b), a -> root, b -> root
+        def commit(date, *parents):
+            lines = [f"tree {'a0' * 20}"] + [f"parent {parent}" for parent in parents]
+            return raw_object("commit", ("\n".join(lines) + f"\nauthor A <a@b> {date} +0000\n\nmsg\n").encode())
+        objects = {"m": commit(40, "a", "b"), "a": commit(30, "root"), "b": commit(20, "root"), "root": commit(10)}
+        mock_read_git_object.side_effect = lambda repo, object_hash: objects.get(object_hash)
+
+        self.assertEqual(set(get_commit_history("/fake/repo", "m", workers=2)), {"m", "a", "b", "root"})
+        self.assertEqual(set(get_commit_history("/fake/repo", "m", max_depth=1)), {"m", "a", "b"})
+        self.assertEqual(len(get_commit_history("/fake/repo", "m", limit=2)), 2)
+        self.assertEqual(set(get_commit_history("/fake/repo", "m", since=25)), {"m", "a"})
+
     @patch("tool.read_git_object")
     def test_build_dependency_graph(self, mock_read_git_object):
-        mock_read_git_object.return_value = (
-            b"100644 blob abcdef1234567890\tfile1.txt\n"
-            b"100644 blob 1234567890abcdef\tfile2.txt\n"
-        )
-        commits = {"abcd1234": {"hash": "abcd1234", "author": "John Doe", "message": "Commit 1", "parents": []}}
+        objects = fake_repository()
+        mock_read_git_object.side_effect = lambda repo, object_hash: objects.get(object_hash)
+        commits = {"c1" * 20: {"hash": "c1" * 20, "author": "John Doe", "message": "Commit 1", "parents": []}}
         graph = build_dependency_graph("/fake/repo", commits)
-        self.assertIn("\"abcd1234\" --> \"file1.txt\" : modifies", graph)
-        self.assertIn("\"abcd1234\" --> \"file2.txt\" : modifies", graph)
+        self.assertIn(f"\"{'c1' * 20}\" --> \"file1.txt\" : modifies", graph)
+        self.assertIn(f"\"{'c1' * 20}\" --> \"src\" : modifies", graph)
+        self.assertIn(f"\"{'c1' * 20}\" --> \"src/lib/file2.txt\" : modifies", graph)
+
+    @patch("tool.read_git_object")
+    def test_build_dependency_graph_diffs_parent(self, mock_read_git_object):
+        objects = fake_repository()
+        mock_read_git_object.side_effect = lambda repo, object_hash: objects.get(object_hash)
+        commits = {"c2" * 20: {"hash": "c2" * 20, "author": "A", "message": "Commit 2", "parents": ["c1" * 20]}}
+        graph = build_dependency_graph("/fake/repo", commits)
+        edges = [line for line in graph if " --> " in line]
+        self.assertEqual(edges, [f"\"{'c2' * 20}\" --> \"file1.txt\" : modifies"])
+
+        # Слияние c2 и боковой ветки c3 (добавлен README): чистое слияние c4 ничего не меняет само,
+        # а в c5 file1.txt отличается от обоих родителей
+        def commit(tree, *parents):
+            lines = [f"tree {tree}"] + [f"parent {parent}" for parent in parents]
+            return raw_object("commit", ("\n".join(lines) + "\nauthor A <a@b> 3 +0000\n\nmsg\n").encode())
+        objects.update({
+            "c3" * 20: commit("a4" * 20, "c1" * 20),
+            "c4" * 20: commit("a5" * 20, "c2" * 20, "c3" * 20),
+            "c5" * 20: commit("a6" * 20, "c2" * 20, "c3" * 20),
+            "a4" * 20: tree_object(("100644", "README", "b4" * 20), ("100644", "file1.txt", "b1" * 20),
+                                   ("40000", "src", "a1" * 20)),
+            "a5" * 20: tree_object(("100644", "README", "b4" * 20), ("100644", "file1.txt", "b3" * 20),
+                                   ("40000", "src", "a1" * 20)),
+            "a6" * 20: tree_object(("100644", "README", "b4" * 20), ("100644", "file1.txt", "b5" * 20),
+                                   ("40000", "src", "a1" * 20)),
+        })
+        commits = {commit_hash: {"hash": commit_hash, "author": "A", "message": "msg", "parents": []}
+                   for commit_hash in ("c3" * 20, "c4" * 20, "c5" * 20)}
+        edges = [line for line in build_dependency_graph("/fake/repo", commits) if " --> " in line]
+        self.assertEqual(edges, [f"\"{'c3' * 20}\" --> \"README\" : modifies",
+                                 f"\"{'c5' * 20}\" --> \"file1.txt\" : modifies"])
+
+    @patch("tool.read_git_object")
+    def test_diff_trees_skips_identical_subtrees(self, mock_read_git_object):
+        objects = fake_repository()
+        mock_read_git_object.side_effect = lambda repo, object_hash: objects.get(object_hash)
+        store = get_object_store("/fake/repo")
+        self.assertEqual(diff_trees(store, "a0" * 20, "a3" * 20), [("file1.txt", False)])
+        self.assertEqual(diff_trees(store, None, "a1" * 20, "src/"),
+                         [("src/lib", True), ("src/lib/file2.txt", False)])
+        self.assertEqual(diff_trees(store, "a3" * 20, "a3" * 20), [])
+        read = [call.args[1] for call in mock_read_git_object.call_args_list]
+        self.assertEqual(read, ["a0" * 20, "a3" * 20, "a1" * 20, "a2" * 20])
+
+    @patch("tool.read_git_object")
+    def test_graph_cache_incremental(self, mock_read_git_object):
+        objects = fake_repository()
+        mock_read_git_object.side_effect = lambda repo, object_hash: objects.get(object_hash)
+        with tempfile.TemporaryDirectory() as tmp:
+            cache_path = os.path.join(tmp, "cache.json")
+            cache = GraphCache(cache_path, "/fake/repo")
+            history = get_commit_history("/fake/repo", "c1" * 20, cache=cache)
+            graph = build_dependency_graph("/fake/repo", history, cache)
+            cache.save()
+
+            clear_object_stores()
+            mock_read_git_object.reset_mock()
+            cache = GraphCache(cache_path, "/fake/repo")
+            self.assertEqual(get_commit_history("/fake/repo", "c1" * 20, cache=cache), history)
+            self.assertEqual(build_dependency_graph("/fake/repo", history, cache), graph)
+            self.assertEqual(mock_read_git_object.call_count, 0)
+
+            # новый тег: читается только новый коммит и изменённые деревья
+            history = get_commit_history("/fake/repo", "c2" * 20, cache=cache)
+            self.assertEqual(set(history), {"c1" * 20, "c2" * 20})
+            build_dependency_graph("/fake/repo", history, cache)
+            read = {call.args[1] for call in mock_read_git_object.call_args_list}
+            self.assertEqual(read, {"c2" * 20, "c1" * 20, "a0" * 20, "a3" * 20})
+
+            self.assertEqual(GraphCache(cache_path, "/other/repo").entries, {})
+
+    def test_graph_cache_rejects_other_versions(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            cache_path = os.path.join(tmp, "cache.json")
+            with open(cache_path, "w") as f:
+                f.write('{"version": 0, "repos": {"x": {}}}')
+            with patch("builtins.print"):
+                self.assertEqual(GraphCache(cache_path, "/fake/repo").repos, {os.path.abspath("/fake/repo"): {}})
+            with open(cache_path, "w") as f:
+                f.write('{"version": 1, "rep')
+            with patch("builtins.print"):
+                cache = GraphCache(cache_path, "/fake/repo")
+            cache.put_changes("c1" * 20, [("file1.txt", False)])
+            cache.save()
+            self.assertEqual(GraphCache(cache_path, "/fake/repo").changes("c1" * 20), [("file1.txt", False)])
+            self.assertEqual(os.listdir(tmp), ["cache.json"])
+
+    @patch("tool.read_git_object")
+    def test_walk_tree_memoized(self, mock_read_git_object):
+        objects = fake_repository()
+        mock_read_git_object.side_effect = lambda repo, object_hash: objects.get(object_hash)
+        store = get_object_store("/fake/repo")
+        paths = walk_tree(store, "a0" * 20)
+        self.assertEqual(paths, (("file1.txt", False), ("src", True), ("src/lib", True), ("src/lib/file2.txt", False)))
+        calls = mock_read_git_object.call_count
+        self.assertIs(walk_tree(store, "a0" * 20), paths)
+        self.assertEqual(mock_read_git_object.call_count, calls)
+
+    def test_parse_commit_object_with_header(self):
+        parsed = parse_commit_object(raw_object("commit", b"tree abcdef\nauthor A <a@b> 1 +0000\n\nmsg\n"))
+        self.assertEqual(parsed["tree"], "abcdef")
+        self.assertEqual(parsed["message"], "msg")
+
+    @patch("tool.read_git_object")
+    def test_object_store_reuses_objects(self, mock_read_git_object):
+        mock_read_git_object.return_value = raw_object("commit", b"tree abcdef\nauthor A <a@b> 1 +0000\n\nmsg\n")
+        store = get_object_store("/fake/repo")
+        self.assertEqual(store.get("abcd1234")[:2], ("commit", 40))
+        self.assertIs(store.commit("abcd1234"), store.commit("abcd1234"))
+        self.assertIs(get_object_store("/fake/repo"), store)
+        self.assertEqual(mock_read_git_object.call_count, 1)
+        self.assertEqual(store.stats()["hits"], 1)
 
     def test_group_files_in_packages(self):
         graph = [
@@ -87,6 +265,100 @@ class TestDependencyVisualizer(unittest.TestCase):
         self.assertIn("package \"folder1\" {", result)
         self.assertIn("\"folder1/file1.txt\" : file", result)
 
+    @patch("tool.read_git_object")
+    def test_write_graph_formats(self, mock_read_git_object):
+        objects = fake_repository()
+        mock_read_git_object.side_effect = lambda repo, object_hash: objects.get(object_hash)
+        history = get_commit_history("/fake/repo", "c2" * 20)
+        changes = collect_changes("/fake/repo", history)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "graph")
+            write_graph(changes, path)
+            with open(path, encoding="utf-8") as f:
+                expected = group_files_in_packages(build_dependency_graph("/fake/repo", history))
+                self.assertEqual(f.read(), expected + "\n")
+
+            write_graph(changes, path, "dot")
+            with open(path, encoding="utf-8") as f:
+                dot = f.read()
+            self.assertTrue(dot.startswith("digraph dependencies {"))
+            self.assertIn('label="src/lib";', dot)
+            self.assertIn(f'"{"c2" * 20}" -> "file1.txt";', dot)
+
+            write_graph(changes, path, "graphml")
+            root = ElementTree.parse(path).getroot()
+            namespace = "{http://graphml.graphdrawing.org/xmlns}"
+            self.assertEqual(len(root.findall(f"{namespace}graph/{namespace}node")), 6)
+            self.assertEqual(len(root.findall(f"{namespace}graph/{namespace}edge")), 5)
+
+    def test_dependency_graph_queries(self):
+        # root -> a -> m, root -> b -> m
+        commits = {
+            "m": {"parents": ["a", "b"]},
+            "a": {"parents": ["root"]},
+            "b": {"parents": ["root"]},
+            "root": {"parents": []},
+        }
+        changes = {
+            "m": [("merge.txt", False)],
+            "a": [("src", True), ("src/a.txt", False)],
+            "b": [("src", True), ("src/b.txt", False)],
+            "root": [("README", False)],
+        }
+        graph = DependencyGraph(commits, changes)
+        self.assertEqual(graph.edge_count(), 6)
+        self.assertEqual(graph.path_targets.itemsize, 4)
+        self.assertEqual(graph.commits_touching("src"), ["a", "b"])
+        self.assertEqual(graph.commits_touching("missing"), [])
+        self.assertTrue(graph.is_reachable("m", "root"))
+        self.assertFalse(graph.is_reachable("a", "b"))
+        self.assertEqual(graph.commits_in_range("a", "m"), ["m", "b"])
+        self.assertEqual(graph.files_in_range("root", "m"), ["merge.txt", "src", "src/a.txt", "src/b.txt"])
+        with self.assertRaisesRegex(ValueError, "typo"):
+            graph.files_in_range("typo", "m")
+
+    def test_collapse_changes(self):
+        changes = {
+            "c1": [("src", True), ("src/lib", True), ("src/lib/a.txt", False), ("README", False)],
+            "c2": [("src", True), ("src/lib", True), ("src/lib/b.txt", False)],
+        }
+        self.assertIs(collapse_changes(changes, 100), changes)
+        self.assertEqual(collapse_changes(changes, 5), {
+            "c1": [("src", True), ("src/lib", True), ("README", False)],
+            "c2": [("src", True), ("src/lib", True)],
+        })
+        self.assertEqual(collapse_changes(changes, 1), {"c1": [("src", True), ("README", False)], "c2": [("src", True)]})
+
+    def test_plantuml_command(self):
+        self.assertEqual(plantuml_command("/opt/plantuml.jar", ["a b.puml"]),
+                         ["java", "-jar", "/opt/plantuml.jar", "a b.puml"])
+        self.assertEqual(plantuml_command("/usr/bin/plantuml", ["a.puml", "b.puml"]),
+                         ["/usr/bin/plantuml", "a.puml", "b.puml"])
+
+    @unittest.skipIf(os.name == "nt", "заглушка PlantUML — скрипт с shebang")
+    def test_renderer_batches_files(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            log_path = os.path.join(tmp, "calls.log")
+            stub = os.path.join(tmp, "plantuml")
+            with open(stub, "w") as f:
+                f.write(f"#!{sys.executable}\n"
+                        "import sys, time\n"
+                        f"open({log_path!r}, 'a').write('|'.join(sys.argv[1:]) + '\\n')\n"
+                        "time.sleep(0.5)\n")
+            os.chmod(stub, 0o755)
+
+            renderer = PlantUMLRenderer(stub)
+            renderer.add(os.path.join(tmp, "v1.puml"))
+            # Даже если первый запуск уже завершился, остальные файлы ждут общего запуска в close()
+            renderer.process.wait()
+            for name in ("v 2.puml", "v3.puml"):
+                renderer.add(os.path.join(tmp, name))
+            self.assertEqual(renderer.close(), [])
+            with open(log_path) as f:
+                calls = f.read().splitlines()
+            self.assertEqual(calls, [os.path.join(tmp, "v1.puml"),
+                                     os.path.join(tmp, "v 2.puml") + "|" + os.path.join(tmp, "v3.puml")])
+
     def test_generate_plantuml_code(self):
         graph = [
             '"abcd1234" --> "file1.txt" : modifies',
@@ -97,5 +369,196 @@ class TestDependencyVisualizer(unittest.TestCase):
         self.assertTrue(plantuml_code.endswith("@enduml"))
         self.assertIn(graph[0], plantuml_code)
 
+
+def git(repo, *args):
+    """Запускает git в репозитории и возвращает stdout."""
+    env = dict(os.environ, GIT_AUTHOR_NAME="Test", GIT_AUTHOR_EMAIL="test@example.com",
+               GIT_COMMITTER_NAME="Test", GIT_COMMITTER_EMAIL="test@example.com")
+    return subprocess.run(["git", "-C", repo, *args], check=True, capture_output=True, env=env).stdout
+
+
+def make_repo(repo, commits=5):
+    """Создает репозиторий с постепенно меняющимся файлом, чтобы в pack-файле появились дельты."""
+    git(repo, "init", "-q")
+    lines = [f"line {number}\n" for number in range(200)]
+    for number in range(commits):
+        lines[number * 7] = f"changed in commit {number}\n"
+        os.makedirs(os.path.join(repo, "src"), exist_ok=True)
+        with open(os.path.join(repo, "src", "main.txt"), "w") as f:
+            f.writelines(lines)
+        git(repo, "add", "-A")
+        git(repo, "commit", "-q", "-m", f"commit {number}")
+
+
+@unittest.skipUnless(shutil.which("git"), "git не установлен")
+class TestPackedObjects(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.repo = self.tmp.name
+        make_repo(self.repo)
+
+    def tearDown(self):
+        for pack in get_packs(self.repo):
+            pack.index.close()
+            pack.close()
+        self.tmp.cleanup()
+
+    def assert_objects_match_git(self):
+        listing = git(self.repo, "cat-file", "--batch-all-objects", "--batch-check").decode().split("\n")
+        objects = [line.split() for line in listing if line]
+        self.assertTrue(objects)
+        for object_hash, object_type, size in objects:
+            body = git(self.repo, "cat-file", object_type, object_hash)
+            expected = f"{object_type} {size}".encode() + b"\0" + body
+            self.assertEqual(read_git_object(self.repo, object_hash), expected)
+
+    def test_ofs_delta(self):
+        git(self.repo, "repack", "-a", "-d", "-f", "-q")
+        self.assertTrue(get_packs(self.repo))
+        self.assert_objects_match_git()
+        self.assertIsNone(read_git_object(self.repo, "0" * 40))
+
+    def test_concurrent_reads(self):
+        git(self.repo, "repack", "-a", "-d", "-f", "-q")
+        listing = git(self.repo, "cat-file", "--batch-all-objects", "--batch-check").decode().split()
+        hashes = listing[0::3]
+        pack = get_packs(self.repo)[0]
+        pack.cache_bytes = 2048
+        with ThreadPoolExecutor(16) as executor:
+            results = list(executor.map(lambda object_hash: read_git_object(self.repo, object_hash), hashes * 20))
+        self.assertNotIn(None, results)
+        self.assertEqual(pack.cache_size, sum(len(data) for _, data in pack.cache.values()))
+        self.assertLessEqual(pack.cache_size, pack.cache_bytes)
+
+    def test_ref_delta(self):
+        git(self.repo, "-c", "repack.useDeltaBaseOffset=false", "repack", "-a", "-d", "-f", "-q")
+        self.assert_objects_match_git()
+
+    def test_apply_delta(self):
+        base = b"hello world"
+        # размер базы 11, размер результата 17, копия 6 байт с нулевого смещения, вставка "there!", копия "world"
+        delta = bytes([11, 17, 0x90, 6, 6]) + b"there!" + bytes([0x91, 6, 5])
+        self.assertEqual(apply_delta(base, delta), b"hello there!world")
+
+
+@unittest.skipUnless(shutil.which("git"), "git не установлен")
+class TestCommitGraph(unittest.TestCase):
+
+    def setUp(self):
+        clear_object_stores()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.repo = self.tmp.name
+        make_repo(self.repo, commits=3)
+        git(self.repo, "branch", "-M", "master")
+        git(self.repo, "checkout", "-q", "-b", "side", "HEAD~2")
+        with open(os.path.join(self.repo, "side.txt"), "w") as f:
+            f.write("side\n")
+        git(self.repo, "add", "-A")
+        git(self.repo, "commit", "-q", "-m", "side")
+        git(self.repo, "checkout", "-q", "-b", "side2", "master~1")
+        git(self.repo, "commit", "-q", "--allow-empty", "-m", "side2")
+        git(self.repo, "checkout", "-q", "master")
+        # слияние трёх родителей попадает в блок EDGE
+        git(self.repo, "merge", "-q", "--no-ff", "-m", "merge", "side", "side2")
+        git(self.repo, "commit-graph", "write", "--reachable")
+
+    def tearDown(self):
+        store = get_object_store(self.repo)
+        if store.commit_graph:
+            store.commit_graph.close()
+        clear_object_stores()
+        self.tmp.cleanup()
+
+    def expected_topology(self):
+        log = git(self.repo, "log", "--all", "--format=%H %T %ct %P").decode().splitlines()
+        return {parts[0]: (parts[1], parts[3:], int(parts[2])) for parts in (line.split() for line in log)}
+
+    def test_lookup_matches_git(self):
+        graph = CommitGraph(os.path.join(self.repo, ".git", "objects", "info", "commit-graph"))
+        try:
+            for commit_hash, topology in self.expected_topology().items():
+                self.assertEqual(graph.lookup(commit_hash), topology)
+            self.assertIsNone(graph.lookup("0" * 40))
+        finally:
+            graph.close()
+
+    def test_history_without_inflating_commits(self):
+        head = git(self.repo, "rev-parse", "HEAD").decode().strip()
+        history = get_commit_history(self.repo, head, details=False)
+        self.assertEqual(set(history), set(self.expected_topology()))
+        store = get_object_store(self.repo)
+        self.assertEqual(store.commits, {})
+        self.assertEqual(store.stats()["commit_graph_hits"], len(history))
+
+    def test_fallback_for_commits_missing_from_graph(self):
+        # Время автора старое, время коммитера новое: оба пути должны брать время коммитера
+        git(self.repo, "commit", "-q", "--allow-empty", "-m", "after graph",
+            "--date", "1000000000 +0000")
+        head = git(self.repo, "rev-parse", "HEAD").decode().strip()
+        history = get_commit_history(self.repo, head, details=False)
+        expected = self.expected_topology()
+        self.assertEqual(set(history), set(expected))
+        store = get_object_store(self.repo)
+        self.assertEqual(list(store.commits), [head])
+        self.assertEqual(store.topology(head), expected[head])
+        since = min(date for _, _, date in expected.values())
+        self.assertEqual(set(get_commit_history(self.repo, head, since=since, details=False)), set(expected))
+        self.assertEqual(set(get_commit_history(self.repo, head, since=since)), set(expected))
+
+
+@unittest.skipUnless(shutil.which("git"), "git не установлен")
+class TestTags(unittest.TestCase):
+
+    def setUp(self):
+        clear_object_stores()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.repo = self.tmp.name
+        make_repo(self.repo, commits=3)
+        git(self.repo, "tag", "light", "HEAD~2")
+        git(self.repo, "tag", "-a", "-m", "release", "release/1.0", "HEAD~1")
+        git(self.repo, "tag", "-a", "-m", "nested", "nested", "release/1.0")
+        git(self.repo, "pack-refs", "--all")
+        git(self.repo, "tag", "-a", "-m", "loose", "loose")
+
+    def tearDown(self):
+        clear_object_stores()
+        self.tmp.cleanup()
+
+    def test_list_tags(self):
+        self.assertEqual(list_tags(self.repo), ["light", "loose", "nested", "release/1.0"])
+
+    def test_resolve_tags(self):
+        for tag in list_tags(self.repo):
+            expected = git(self.repo, "rev-parse", f"{tag}^{{commit}}").decode().strip()
+            self.assertEqual(resolve_tag(self.repo, tag), expected)
+        self.assertIsNone(resolve_tag(self.repo, "missing"))
+
+    @unittest.skipIf(os.name == "nt", "заглушка PlantUML — скрипт с shebang")
+    def test_batch_skips_missing_tags(self):
+        stub = os.path.join(self.repo, "plantuml")
+        with open(stub, "w") as f:
+            f.write("#!/bin/sh\n")
+        os.chmod(stub, 0o755)
+        config = os.path.join(self.repo, "config.csv")
+        output = os.path.join(self.repo, "out", "{tag}.puml")
+        os.makedirs(os.path.dirname(output))
+        with open(config, "w") as f:
+            f.write(f"plantuml_tool,{stub}\nrepo_path,{self.repo}\ntag_name,light\noutput_path,{output}\n")
+        cache_path = os.path.join(self.repo, "cache.json")
+        result = subprocess.run([sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "tool.py"),
+                                 "--config", config, "--tags", "light,nope,loose", "--cache", cache_path],
+                                capture_output=True, text=True)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertIn("nope", result.stdout)
+        self.assertEqual(sorted(os.listdir(os.path.dirname(output))), ["light.puml", "loose.puml"])
+        self.assertTrue(os.path.exists(cache_path))
+
+    def test_output_path_for_tag(self):
+        self.assertEqual(output_path_for_tag("out.puml", "v1", False), "out.puml")
+        self.assertEqual(output_path_for_tag("out.puml", "release/1.0", True), "out_release_1.0.puml")
+        self.assertEqual(output_path_for_tag("graphs/{tag}.puml", "v1", False), "graphs/v1.puml")
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -3,6 +3,20 @@ import csv
 import datetime
 import argparse
 import zlib
+import mmap
+import struct
+import threading
+import json
+import tempfile
+import subprocess
+from array import array
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from xml.sax.saxutils import quoteattr
+
+OBJECT_TYPES = {1: 'commit', 2: 'tree', 3: 'blob', 4: 'tag'}
+OFS_DELTA = 6
+REF_DELTA = 7
 
 def load_config(config_path):
     """Загружает конфигурацию из CSV-файла."""
@@ -20,11 +34,326 @@ def get_branches(repo_path):
     heads_path = os.path.join(repo_path, '.git', 'refs', 'heads')
     return [branch for branch in os.listdir(heads_path) if os.path.isfile(os.path.join(heads_path, branch))]
 
+def find_sha(data, fanout, names_offset, sha):
+    """Ищет 20-байтовый хэш в отсортированной таблице по таблице fanout; возвращает номер или None."""
+    low = fanout[sha[0] - 1] if sha[0] else 0
+    high = fanout[sha[0]]
+    while low < high:
+        middle = (low + high) // 2
+        position = names_offset + middle * 20
+        current = data[position:position + 20]
+        if current < sha:
+            low = middle + 1
+        elif current > sha:
+            high = middle
+        else:
+            return middle
+    return None
+
+
+class PackIndex:
+    """Индекс pack-файла версии 2, отображенный в память."""
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.data[:8] != b'\377tOc\x00\x00\x00\x02':
+            self.data.close()
+            raise ValueError(f"Неподдерживаемый формат индекса: {path}")
+        self.fanout = struct.unpack_from('>256I', self.data, 8)
+        self.count = self.fanout[255]
+        self.names_offset = 8 + 256 * 4
+        self.offsets_offset = self.names_offset + self.count * 24
+        self.large_offsets_offset = self.offsets_offset + self.count * 4
+
+    def find(self, sha):
+        """Возвращает смещение объекта в pack-файле или None (двоичный поиск)."""
+        number = find_sha(self.data, self.fanout, self.names_offset, sha)
+        return None if number is None else self.offset_at(number)
+
+    def offset_at(self, number):
+        offset, = struct.unpack_from('>I', self.data, self.offsets_offset + number * 4)
+        if offset & 0x80000000:
+            offset, = struct.unpack_from('>Q', self.data, self.large_offsets_offset + (offset & 0x7fffffff) * 8)
+        return offset
+
+    def close(self):
+        self.data.close()
+
+
+class PackFile:
+    """Pack-файл с разрешением OFS_DELTA/REF_DELTA и кэшем баз дельт."""
+
+    def __init__(self, path, index, cache_bytes=32 * 1024 * 1024):
+        with open(path, 'rb') as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.data[:4] != b'PACK':
+            self.data.close()
+            raise ValueError(f"Неверная сигнатура pack-файла: {path}")
+        self.index = index
+        self.cache = OrderedDict()
+        self.cache_size = 0
+        self.cache_bytes = cache_bytes
+        self.cache_lock = threading.Lock()
+
+    def _header(self, offset):
+        byte = self.data[offset]
+        offset += 1
+        type_num = (byte >> 4) & 7
+        size = byte & 0x0f
+        shift = 4
+        while byte & 0x80:
+            byte = self.data[offset]
+            offset += 1
+            size |= (byte & 0x7f) << shift
+            shift += 7
+        return type_num, size, offset
+
+    def _inflate(self, offset, size):
+        decompressor = zlib.decompressobj()
+        chunk = max(size + 64, 4096)
+        result = []
+        while not decompressor.eof:
+            if offset >= len(self.data):
+                raise zlib.error("Неожиданный конец pack-файла")
+            result.append(decompressor.decompress(self.data[offset:offset + chunk]))
+            offset += chunk
+        return b''.join(result)
+
+    def _cache_get(self, offset):
+        with self.cache_lock:
+            entry = self.cache.get(offset)
+            if entry is not None:
+                self.cache.move_to_end(offset)
+            return entry
+
+    def _cache_put(self, offset, type_num, data):
+        if len(data) > self.cache_bytes:
+            return
+        with self.cache_lock:
+            if offset in self.cache:
+                return
+            self.cache[offset] = (type_num, data)
+            self.cache_size += len(data)
+            while self.cache_size > self.cache_bytes:
+                _, (_, evicted) = self.cache.popitem(last=False)
+                self.cache_size -= len(evicted)
+
+    def read(self, offset, resolve_ref):
+        """Читает объект по смещению; resolve_ref(sha) ищет базу REF_DELTA вне этого pack-файла."""
+        chain = []
+        while True:
+            cached = self._cache_get(offset)
+            if cached is not None:
+                type_num, data = cached
+                break
+            type_num, size, position = self._header(offset)
+            if type_num == OFS_DELTA:
+                byte = self.data[position]
+                position += 1
+                base_distance = byte & 0x7f
+                while byte & 0x80:
+                    byte = self.data[position]
+                    position += 1
+                    base_distance = ((base_distance + 1) << 7) | (byte & 0x7f)
+                chain.append((offset, position, size))
+                offset -= base_distance
+            elif type_num == REF_DELTA:
+                base_sha = self.data[position:position + 20]
+                position += 20
+                chain.append((offset, position, size))
+                base_offset = self.index.find(base_sha)
+                if base_offset is not None:
+                    offset = base_offset
+                    continue
+                base = resolve_ref(base_sha.hex())
+                if base is None:
+                    return None
+                type_num, data = base
+                break
+            else:
+                data = self._inflate(position, size)
+                self._cache_put(offset, type_num, data)
+                break
+
+        for delta_offset, position, size in reversed(chain):
+            data = apply_delta(data, self._inflate(position, size))
+            self._cache_put(delta_offset, type_num, data)
+        return type_num, data
+
+    def close(self):
+        self.data.close()
+
+
+class CommitGraph:
+    """Файл .git/objects/info/commit-graph: родители, корневое дерево и дата коммитов без разжатия объектов."""
+
+    NO_PARENT = 0x70000000
+    EXTRA_EDGES = 0x80000000
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        signature, version, hash_version, chunk_count = struct.unpack_from('>4sBBB', self.data, 0)
+        if signature != b'CGPH' or version != 1 or hash_version != 1:
+            self.data.close()
+            raise ValueError(f"Неподдерживаемый формат commit-graph: {path}")
+        self.chunks = {}
+        for number in range(chunk_count):
+            chunk_id, offset = struct.unpack_from('>4sQ', self.data, 8 + number * 12)
+            self.chunks[chunk_id] = offset
+        for required in (b'OIDF', b'OIDL', b'CDAT'):
+            if required not in self.chunks:
+                self.data.close()
+                raise ValueError(f"В commit-graph нет блока {required.decode()}: {path}")
+        self.fanout = struct.unpack_from('>256I', self.data, self.chunks[b'OIDF'])
+        self.count = self.fanout[255]
+
+    def hash_at(self, number):
+        position = self.chunks[b'OIDL'] + number * 20
+        return self.data[position:position + 20].hex()
+
+    def lookup(self, object_hash):
+        """Возвращает (дерево, родители, дата) коммита или None, если его нет в графе."""
+        number = find_sha(self.data, self.fanout, self.chunks[b'OIDL'], bytes.fromhex(object_hash))
+        if number is None:
+            return None
+        position = self.chunks[b'CDAT'] + number * 36
+        tree = self.data[position:position + 20].hex()
+        first, second, date_high, date_low = struct.unpack_from('>IIII', self.data, position + 20)
+        parents = []
+        if first != self.NO_PARENT:
+            parents.append(self.hash_at(first))
+        if second & self.EXTRA_EDGES:
+            edge = self.chunks[b'EDGE'] + (second & ~self.EXTRA_EDGES) * 4
+            while True:
+                value, = struct.unpack_from('>I', self.data, edge)
+                parents.append(self.hash_at(value & ~self.EXTRA_EDGES))
+                if value & self.EXTRA_EDGES:
+                    break
+                edge += 4
+        elif second != self.NO_PARENT:
+            parents.append(self.hash_at(second))
+        return tree, parents, ((date_high & 3) << 32) | date_low
+
+    def close(self):
+        self.data.close()
+
+
+def apply_delta(base, delta):
+    """Применяет дельту git к базовому объекту."""
+    def read_size(position):
+        size = shift = 0
+        while True:
+            byte = delta[position]
+            position += 1
+            size |= (byte & 0x7f) << shift
+            shift += 7
+            if not byte & 0x80:
+                return size, position
+
+    base_size, position = read_size(0)
+    result_size, position = read_size(position)
+    if base_size != len(base):
+        raise ValueError("Размер базы дельты не совпадает")
+    result = bytearray()
+    while position < len(delta):
+        opcode = delta[position]
+        position += 1
+        if opcode & 0x80:
+            copy_offset = copy_size = 0
+            for bit in range(4):
+                if opcode & (1 << bit):
+                    copy_offset |= delta[position] << (8 * bit)
+                    position += 1
+            for bit in range(3):
+                if opcode & (0x10 << bit):
+                    copy_size |= delta[position] << (8 * bit)
+                    position += 1
+            result += base[copy_offset:copy_offset + (copy_size or 0x10000)]
+        elif opcode:
+            result += delta[position:position + opcode]
+            position += opcode
+        else:
+            raise ValueError("Недопустимая команда дельты")
+    if len(result) != result_size:
+        raise ValueError("Размер результата дельты не совпадает")
+    return bytes(result)
+
+
+_packs = {}
+_packs_lock = threading.Lock()
+
+
+def get_packs(repo_path):
+    """Возвращает открытые pack-файлы репозитория; список обновляется при изменении каталога pack."""
+    pack_dir = os.path.join(repo_path, '.git', 'objects', 'pack')
+    try:
+        mtime = os.stat(pack_dir).st_mtime_ns
+    except OSError:
+        return []
+    with _packs_lock:
+        cached = _packs.get(pack_dir)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        if cached is not None:
+            for pack in cached[1]:
+                pack.index.close()
+                pack.close()
+        packs = []
+        for name in sorted(os.listdir(pack_dir)):
+            if not name.endswith('.idx'):
+                continue
+            pack_path = os.path.join(pack_dir, name[:-4] + '.pack')
+            if not os.path.exists(pack_path):
+                continue
+            try:
+                packs.append(PackFile(pack_path, PackIndex(os.path.join(pack_dir, name))))
+            except (OSError, ValueError) as e:
+                print(f"Ошибка открытия pack-файла {pack_path}: {e}")
+        _packs[pack_dir] = (mtime, packs)
+        return packs
+
+
+def read_packed_object(repo_path, object_hash):
+    """Ищет объект в pack-файлах; возвращает (тип, содержимое) или None."""
+    try:
+        sha = bytes.fromhex(object_hash)
+    except ValueError:
+        return None
+    if len(sha) != 20:
+        return None
+
+    def resolve_ref(base_hash):
+        raw = read_git_object(repo_path, base_hash)
+        if raw is None:
+            return None
+        header, _, body = raw.partition(b'\0')
+        type_name = header.split(b' ')[0].decode()
+        type_num = next(num for num, name in OBJECT_TYPES.items() if name == type_name)
+        return type_num, body
+
+    for pack in get_packs(repo_path):
+        offset = pack.index.find(sha)
+        if offset is None:
+            continue
+        try:
+            return pack.read(offset, resolve_ref)
+        except (zlib.error, ValueError, IndexError) as e:
+            print(f"Ошибка чтения объекта {object_hash} из pack-файла: {e}")
+            return None
+    return None
+
+
 def read_git_object(repo_path, object_hash):
-    """Читает и разжимает объект Git по его хэшу."""
+    """Читает и разжимает объект Git по его хэшу (loose-объект или pack-файл)."""
     object_path = os.path.join(repo_path, '.git', 'objects', object_hash[:2], object_hash[2:])
     if not os.path.exists(object_path):
-        return None
+        packed = read_packed_object(repo_path, object_hash)
+        if packed is None:
+            return None
+        type_num, body = packed
+        return f"{OBJECT_TYPES[type_num]} {len(body)}".encode() + b'\0' + body
     with open(object_path, 'rb') as f:
         compressed_data = f.read()
     try:
@@ -33,8 +362,286 @@ def read_git_object(repo_path, object_hash):
         print(f"Ошибка разжатия данных для объекта {object_hash}: {e}")
         return None
 
+def split_object(raw_data):
+    """Разбирает сырой объект на (тип, размер, содержимое); без заголовка возвращает None."""
+    header, separator, body = raw_data.partition(b'\0')
+    parts = header.split(b' ')
+    if not separator or len(parts) != 2 or not parts[1].isdigit():
+        return None
+    return parts[0].decode(), int(parts[1]), body
+
+
+def parse_tree_object(body):
+    """Парсит содержимое объекта дерева в список (режим, имя, хэш)."""
+    entries = []
+    position = 0
+    while position < len(body):
+        space = body.index(b' ', position)
+        null = body.index(b'\0', space)
+        mode = body[position:space].decode()
+        name = body[space + 1:null].decode(errors='replace')
+        entries.append((mode, name, body[null + 1:null + 21].hex()))
+        position = null + 21
+    return entries
+
+
+class ObjectStore:
+    """Общее для процесса хранилище объектов репозитория: LRU-кэш по байтам и разобранные коммиты и деревья."""
+
+    def __init__(self, repo_path, max_bytes=64 * 1024 * 1024):
+        self.repo_path = repo_path
+        self.max_bytes = max_bytes
+        self.objects = OrderedDict()
+        self.size = 0
+        self.commits = {}
+        self.trees = {}
+        self.walks = {}
+        self.lock = threading.Lock()
+        self._commit_graph = None
+        self.graph_hits = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, object_hash):
+        """Возвращает (тип, размер, содержимое) объекта или None."""
+        with self.lock:
+            entry = self.objects.get(object_hash)
+            if entry is not None:
+                self.objects.move_to_end(object_hash)
+                self.hits += 1
+                return entry
+            self.misses += 1
+        raw_data = read_git_object(self.repo_path, object_hash)
+        if raw_data is None:
+            return None
+        entry = split_object(raw_data)
+        if entry is None:
+            print(f"Некорректный заголовок объекта {object_hash}")
+            return None
+        with self.lock:
+            if object_hash not in self.objects and len(entry[2]) <= self.max_bytes:
+                self.objects[object_hash] = entry
+                self.size += len(entry[2])
+                while self.size > self.max_bytes:
+                    _, evicted = self.objects.popitem(last=False)
+                    self.size -= len(evicted[2])
+        return entry
+
+    def commit(self, object_hash):
+        """Возвращает разобранный коммит (см. parse_commit_object) или None."""
+        commit_info = self.commits.get(object_hash)
+        if commit_info is None:
+            entry = self.get(object_hash)
+            if entry is None or entry[0] != 'commit':
+                return None
+            commit_info = self.commits[object_hash] = parse_commit_object(entry[2])
+        return commit_info
+
+    @property
+    def commit_graph(self):
+        """Файл commit-graph репозитория (False, если его нет или он не читается)."""
+        if self._commit_graph is None:
+            path = os.path.join(self.repo_path, '.git', 'objects', 'info', 'commit-graph')
+            self._commit_graph = False
+            if os.path.exists(path):
+                try:
+                    self._commit_graph = CommitGraph(path)
+                except (OSError, ValueError, struct.error) as e:
+                    print(f"Ошибка чтения commit-graph: {e}")
+        return self._commit_graph
+
+    def topology(self, object_hash):
+        """Возвращает (дерево, родители, время коммитера) коммита: из commit-graph, а при его отсутствии — из объекта."""
+        commit_info = self.commits.get(object_hash)
+        if commit_info is None and self.commit_graph:
+            entry = self.commit_graph.lookup(object_hash)
+            if entry is not None:
+                self.graph_hits += 1
+                return entry
+        if commit_info is None:
+            commit_info = self.commit(object_hash)
+            if commit_info is None:
+                return None
+        return commit_info['tree'], commit_info['parents'], commit_time(commit_info)
+
+    def tree(self, object_hash):
+        """Возвращает разобранное дерево (см. parse_tree_object) или None."""
+        entries = self.trees.get(object_hash)
+        if entries is None:
+            entry = self.get(object_hash)
+            if entry is None or entry[0] != 'tree':
+                return None
+            entries = self.trees[object_hash] = parse_tree_object(entry[2])
+        return entries
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'cached_objects': len(self.objects),
+            'cached_bytes': self.size,
+            'commits': len(self.commits),
+            'trees': len(self.trees),
+            'walked_trees': len(self.walks),
+            'commit_graph_hits': self.graph_hits,
+        }
+
+
+def walk_tree(store, tree_hash):
+    """Рекурсивно обходит дерево и возвращает кортеж (путь, это_папка); результат запоминается по хэшу дерева."""
+    paths = store.walks.get(tree_hash)
+    if paths is not None:
+        return paths
+    entries = store.tree(tree_hash)
+    if entries is None:
+        return ()
+    result = []
+    for mode, name, object_hash in entries:
+        if mode == '40000':
+            result.append((name, True))
+            result.extend((f'{name}/{path}', is_dir) for path, is_dir in walk_tree(store, object_hash))
+        else:
+            result.append((name, False))
+    paths = store.walks[tree_hash] = tuple(result)
+    return paths
+
+
+class GraphCache:
+    """Сохраняемый между запусками кэш коммитов и их изменений, ключи — путь репозитория и хэш коммита."""
+
+    VERSION = 2
+
+    def __init__(self, path, repo_path):
+        """path=None — кэш только в памяти (например, общий для нескольких тегов одного запуска)."""
+        self.path = path
+        self.repo_key = os.path.abspath(repo_path)
+        self.repos = {}
+        self.dirty = False
+        try:
+            if path is None:
+                raise FileNotFoundError
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == self.VERSION and isinstance(data.get('repos'), dict):
+                self.repos = data['repos']
+            else:
+                print(f"Кэш {path} другой версии, он будет пересоздан.")
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, AttributeError) as e:
+            print(f"Кэш {path} повреждён и будет пересоздан: {e}")
+        self.entries = self.repos.setdefault(self.repo_key, {})
+
+    def commit(self, commit_hash):
+        """Возвращает сохранённые данные коммита или None."""
+        entry = self.entries.get(commit_hash)
+        if entry is None or 'parents' not in entry:
+            return None
+        return {'tree': entry['tree'], 'parents': entry['parents'], 'author': entry['author'],
+                'date': entry['date'], 'committer': entry['committer'], 'committer_date': entry['committer_date'],
+                'message': entry['message']}
+
+    def put_commit(self, commit_hash, commit_info):
+        entry = self.entries.setdefault(commit_hash, {})
+        if entry.get('author') is not None and commit_info['author'] is None:
+            return
+        values = {key: commit_info[key]
+                  for key in ('tree', 'parents', 'author', 'date', 'committer', 'committer_date', 'message')}
+        if any(entry.get(key) != value for key, value in values.items()):
+            entry.update(values)
+            self.dirty = True
+
+    def changes(self, commit_hash):
+        """Возвращает сохранённый список изменённых путей коммита или None."""
+        entry = self.entries.get(commit_hash)
+        if entry is None or 'changes' not in entry:
+            return None
+        return [(path, is_dir) for path, is_dir in entry['changes']]
+
+    def put_changes(self, commit_hash, changes):
+        self.entries.setdefault(commit_hash, {})['changes'] = [[path, is_dir] for path, is_dir in changes]
+        self.dirty = True
+
+    def save(self):
+        """Атомарно записывает кэш (через временный файл и os.replace)."""
+        if not self.dirty or self.path is None:
+            return
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix='.graph_cache', dir=directory)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({'version': self.VERSION, 'repos': self.repos}, f, ensure_ascii=False,
+                          separators=(',', ':'))
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        self.dirty = False
+
+
+def diff_trees(store, old_tree, new_tree, prefix=''):
+    """Возвращает список (путь, это_папка) изменённых путей между двумя деревьями; одинаковые поддеревья пропускаются."""
+    if old_tree == new_tree:
+        return []
+    if old_tree is None:
+        return [(prefix + path, is_dir) for path, is_dir in walk_tree(store, new_tree)]
+    if new_tree is None:
+        return [(prefix + path, is_dir) for path, is_dir in walk_tree(store, old_tree)]
+    old_entries = {name: (mode, object_hash) for mode, name, object_hash in store.tree(old_tree) or ()}
+    new_entries = {name: (mode, object_hash) for mode, name, object_hash in store.tree(new_tree) or ()}
+    changes = []
+    for name in sorted(old_entries.keys() | new_entries.keys()):
+        old_mode, old_hash = old_entries.get(name, (None, None))
+        new_mode, new_hash = new_entries.get(name, (None, None))
+        if old_mode == new_mode and old_hash == new_hash:
+            continue
+        path = prefix + name
+        old_is_dir = old_mode == '40000'
+        new_is_dir = new_mode == '40000'
+        changes.append((path, old_is_dir or new_is_dir))
+        if old_is_dir and new_is_dir:
+            changes.extend(diff_trees(store, old_hash, new_hash, path + '/'))
+        elif old_is_dir:
+            changes.extend(diff_trees(store, old_hash, None, path + '/'))
+        elif new_is_dir:
+            changes.extend(diff_trees(store, None, new_hash, path + '/'))
+    return changes
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_object_store(repo_path):
+    """Возвращает общее хранилище объектов для репозитория."""
+    key = os.path.abspath(repo_path)
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = _stores[key] = ObjectStore(repo_path)
+        return store
+
+
+def clear_object_stores():
+    """Сбрасывает все хранилища объектов (например, после изменения репозитория)."""
+    with _stores_lock:
+        _stores.clear()
+
+
+def commit_time(commit_info):
+    """Время коммитера (как в commit-graph); для объектов без строки committer — время автора."""
+    if commit_info.get('committer_date') is not None:
+        return commit_info['committer_date']
+    return commit_info['date']
+
+
 def parse_commit_object(raw_data):
-    """Парсит объект коммита из сырых данных."""
+    """Парсит объект коммита из сырых данных (с заголовком "commit N\\0" или без него)."""
+    if raw_data.startswith(b'commit '):
+        parsed = split_object(raw_data)
+        if parsed is not None:
+            raw_data = parsed[2]
     raw_text = raw_data.decode(errors='replace')
     lines = raw_text.split('\n')
     commit_info = {
@@ -42,6 +649,8 @@ def parse_commit_object(raw_data):
         'parents': [],
         'author': None,
         'date': None,
+        'committer': None,
+        'committer_date': None,
         'message': ''
     }
     i = 0
@@ -60,64 +669,309 @@ def parse_commit_object(raw_data):
                 print(f"Ошибка при обработке строки author: {line}")
                 commit_info['author'] = None
                 commit_info['date'] = None
+        elif line.startswith('committer '):
+            try:
+                parts = line.split()
+                commit_info['committer'] = ' '.join(parts[1:-2])
+                commit_info['committer_date'] = int(parts[-2])
+            except (ValueError, IndexError):
+                print(f"Ошибка при обработке строки committer: {line}")
+                commit_info['committer'] = None
+                commit_info['committer_date'] = None
         elif line == '':
             commit_info['message'] = '\n'.join(lines[i + 1:]).strip()
             break
         i += 1
     return commit_info
 
-def get_commit_history(repo_path, tag_commit_hash):
-    """Собирает историю коммитов начиная с указанного хэша."""
+def read_packed_refs(repo_path):
+    """Читает .git/packed-refs: словарь имя ссылки -> (хэш, хэш после разыменования тега или None)."""
+    refs = {}
+    path = os.path.join(repo_path, '.git', 'packed-refs')
+    if not os.path.exists(path):
+        return refs
+    last = None
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            if line.startswith('^'):
+                if last is not None:
+                    refs[last] = (refs[last][0], line[1:])
+                continue
+            object_hash, _, name = line.partition(' ')
+            refs[name] = (object_hash, None)
+            last = name
+    return refs
+
+
+def list_tags(repo_path, packed_refs=None):
+    """Возвращает отсортированный список тегов (loose и packed)."""
+    if packed_refs is None:
+        packed_refs = read_packed_refs(repo_path)
+    tags = {name[len('refs/tags/'):] for name in packed_refs if name.startswith('refs/tags/')}
+    tags_dir = os.path.join(repo_path, '.git', 'refs', 'tags')
+    for root, _, files in os.walk(tags_dir):
+        for file in files:
+            tags.add(os.path.relpath(os.path.join(root, file), tags_dir).replace(os.sep, '/'))
+    return sorted(tags)
+
+
+def resolve_tag(repo_path, tag_name, packed_refs=None):
+    """Возвращает хэш коммита, на который указывает тег (loose, packed или аннотированный), или None."""
+    tag_ref_path = os.path.join(repo_path, '.git', 'refs', 'tags', *tag_name.split('/'))
+    object_hash = None
+    if os.path.isfile(tag_ref_path):
+        with open(tag_ref_path, 'r') as f:
+            object_hash = f.read().strip()
+    else:
+        if packed_refs is None:
+            packed_refs = read_packed_refs(repo_path)
+        packed = packed_refs.get(f'refs/tags/{tag_name}')
+        if packed is None:
+            return None
+        object_hash = packed[1] or packed[0]
+
+    # Аннотированный тег указывает на объект tag; разыменовываем до коммита
+    store = get_object_store(repo_path)
+    while object_hash:
+        entry = store.get(object_hash)
+        if entry is None or entry[0] != 'tag':
+            return object_hash
+        target = entry[2].split(b'\n', 1)[0]
+        if not target.startswith(b'object '):
+            return None
+        object_hash = target[len(b'object '):].decode().strip()
+    return None
+
+
+def output_path_for_tag(output_path, tag_name, batch):
+    """Имя выходного файла для тега: подстановка {tag} или суффикс _<тег> в пакетном режиме."""
+    safe_tag = tag_name.replace('/', '_')
+    if '{tag}' in output_path:
+        return output_path.replace('{tag}', safe_tag)
+    if not batch:
+        return output_path
+    stem, extension = os.path.splitext(output_path)
+    return f'{stem}_{safe_tag}{extension}'
+
+
+def get_commit_history(repo_path, tag_commit_hash, max_depth=None, limit=None, since=None, workers=None,
+                       details=True, cache=None):
+    """Собирает историю коммитов начиная с указанного хэша, обходя всех родителей в ширину.
+
+    max_depth ограничивает глубину обхода, limit — число коммитов, since — UNIX-время коммитера самого старого коммита.
+    Коммиты одного фронта читаются и разжимаются параллельно. При details=False автор и сообщение
+    не нужны, и топология берётся из commit-graph без разжатия объектов. Коммиты из cache (GraphCache)
+    не читаются повторно.
+    """
     all_commits = {}
-    commit_hash = tag_commit_hash
+    store = get_object_store(repo_path)
 
-    while commit_hash:
-        if commit_hash in all_commits:
-            break
-        raw_data = read_git_object(repo_path, commit_hash)
-        if raw_data is None:
-            break
-        commit_info = parse_commit_object(raw_data)
-        if commit_info['date'] is None:
-            print(f"Пропускаем коммит {commit_hash}: отсутствует или некорректная дата.\nCommit Info: {commit_info}")
-            break
-        # Не добавляем дату и время в результат
-        all_commits[commit_hash] = {
-            'hash': commit_hash,
-            'author': commit_info['author'],
-            'message': commit_info['message'],
-            'parents': commit_info['parents'],
-        }
-        commit_hash = commit_info['parents'][0] if commit_info['parents'] else None
+    def read_commit(commit_hash):
+        if cache is not None:
+            commit_info = cache.commit(commit_hash)
+            if commit_info is not None and (not details or commit_info['author'] is not None):
+                return commit_info
+        if details:
+            return store.commit(commit_hash)
+        topology = store.topology(commit_hash)
+        if topology is None:
+            return None
+        tree, parents, date = topology
+        return {'tree': tree, 'parents': parents, 'author': None, 'date': None, 'committer': None,
+                'committer_date': date, 'message': None}
+    visited = {tag_commit_hash}
+    frontier = [tag_commit_hash]
+    depth = 0
+
+    with ThreadPoolExecutor(workers) as executor:
+        while frontier and (limit is None or len(all_commits) < limit):
+            next_frontier = []
+            for commit_hash, commit_info in zip(frontier, executor.map(read_commit, frontier)):
+                if commit_info is None:
+                    continue
+                if commit_time(commit_info) is None:
+                    print(f"Пропускаем коммит {commit_hash}: отсутствует или некорректная дата.\nCommit Info: {commit_info}")
+                    continue
+                if since is not None and commit_time(commit_info) < since:
+                    continue
+                if cache is not None:
+                    cache.put_commit(commit_hash, commit_info)
+                # Не добавляем дату и время в результат
+                all_commits[commit_hash] = {
+                    'hash': commit_hash,
+                    'author': commit_info['author'],
+                    'message': commit_info['message'],
+                    'parents': commit_info['parents'],
+                }
+                if limit is not None and len(all_commits) >= limit:
+                    break
+                for parent in commit_info['parents']:
+                    if parent not in visited:
+                        visited.add(parent)
+                        next_frontier.append(parent)
+            depth += 1
+            if max_depth is not None and depth > max_depth:
+                break
+            frontier = next_frontier
 
     return all_commits
 
 
-def build_dependency_graph(repo_path, commits):
-    """Формирует граф зависимостей на основе данных о коммитах."""
+def commit_changes(store, commit_hash):
+    """Возвращает пути, изменённые коммитом (у корневого коммита — все пути).
+
+    У слияния остаются только пути, отличающиеся от каждого из родителей (правило combined diff в git),
+    поэтому изменения, пришедшие из влитой ветки, не приписываются коммиту слияния.
+    """
+    topology = store.topology(commit_hash)
+    if topology is None or topology[0] is None:
+        return None
+    tree, parents, _ = topology
+    changes = None
+    for parent in parents or [None]:
+        parent_topology = store.topology(parent) if parent else None
+        parent_changes = diff_trees(store, parent_topology[0] if parent_topology else None, tree)
+        if changes is None:
+            changes = parent_changes
+        else:
+            changed_paths = {path for path, _ in parent_changes}
+            changes = [change for change in changes if change[0] in changed_paths]
+        if not changes:
+            break
+    return changes
+
+
+def collect_changes(repo_path, commits, cache=None):
+    """Возвращает словарь хэш коммита -> список (путь, это_папка) изменённых им путей."""
+    store = get_object_store(repo_path)
+    result = {}
+    for commit_hash in commits:
+        changes = cache.changes(commit_hash) if cache is not None else None
+        if changes is None:
+            changes = commit_changes(store, commit_hash)
+            if changes is not None and cache is not None:
+                cache.put_changes(commit_hash, changes)
+        result[commit_hash] = changes or []
+    return result
+
+
+class DependencyGraph:
+    """Компактный граф: хэши и пути заменены целыми номерами, рёбра хранятся в массивах в формате CSR."""
+
+    def __init__(self, commits, changes):
+        """commits — история (см. get_commit_history), changes — изменения (см. collect_changes)."""
+        self.commits = list(commits)
+        self.commit_ids = {commit_hash: number for number, commit_hash in enumerate(self.commits)}
+        self.paths = []
+        self.path_ids = {}
+
+        # Коммит -> пути и коммит -> родители (только родители из истории)
+        self.path_offsets, self.path_targets = array('I', [0]), array('I')
+        self.parent_offsets, self.parent_targets = array('I', [0]), array('I')
+        for commit_hash in self.commits:
+            for file_path, _ in changes.get(commit_hash, ()):
+                path_id = self.path_ids.get(file_path)
+                if path_id is None:
+                    path_id = self.path_ids[file_path] = len(self.paths)
+                    self.paths.append(file_path)
+                self.path_targets.append(path_id)
+            self.path_offsets.append(len(self.path_targets))
+            for parent in commits[commit_hash]['parents']:
+                parent_id = self.commit_ids.get(parent)
+                if parent_id is not None:
+                    self.parent_targets.append(parent_id)
+            self.parent_offsets.append(len(self.parent_targets))
+
+        # Обратный индекс путь -> коммиты (подсчёт, затем заполнение)
+        counts = array('I', bytes(4 * (len(self.paths) + 1)))
+        for path_id in self.path_targets:
+            counts[path_id + 1] += 1
+        for number in range(len(self.paths)):
+            counts[number + 1] += counts[number]
+        self.commit_offsets = array('I', counts)
+        self.commit_targets = array('I', bytes(4 * len(self.path_targets)))
+        for commit_id in range(len(self.commits)):
+            for position in range(self.path_offsets[commit_id], self.path_offsets[commit_id + 1]):
+                path_id = self.path_targets[position]
+                self.commit_targets[counts[path_id]] = commit_id
+                counts[path_id] += 1
+
+    def edge_count(self):
+        return len(self.path_targets)
+
+    def paths_of(self, commit_id):
+        return self.path_targets[self.path_offsets[commit_id]:self.path_offsets[commit_id + 1]]
+
+    def parents_of(self, commit_id):
+        return self.parent_targets[self.parent_offsets[commit_id]:self.parent_offsets[commit_id + 1]]
+
+    def commits_touching(self, file_path):
+        """Возвращает хэши коммитов, изменявших путь."""
+        path_id = self.path_ids.get(file_path)
+        if path_id is None:
+            return []
+        start, end = self.commit_offsets[path_id], self.commit_offsets[path_id + 1]
+        return [self.commits[commit_id] for commit_id in self.commit_targets[start:end]]
+
+    def ancestor_ids(self, commit_hash):
+        """Возвращает bytearray-отметки коммитов, достижимых из данного (включая его самого)."""
+        reached = bytearray(len(self.commits))
+        start = self.commit_ids.get(commit_hash)
+        if start is None:
+            return reached
+        reached[start] = 1
+        queue = deque([start])
+        while queue:
+            for parent_id in self.parents_of(queue.popleft()):
+                if not reached[parent_id]:
+                    reached[parent_id] = 1
+                    queue.append(parent_id)
+        return reached
+
+    def is_reachable(self, source, target):
+        """Проверяет, достижим ли коммит target из source по родительским связям."""
+        target_id = self.commit_ids.get(target)
+        return target_id is not None and bool(self.ancestor_ids(source)[target_id])
+
+    def commits_in_range(self, start, end):
+        """Коммиты диапазона start..end: достижимые из end, но не из start (как в git log A..B)."""
+        for commit_hash in (start, end):
+            # Как git log A..B: неизвестный конец — ошибка, а не пустое множество исключений
+            if commit_hash not in self.commit_ids:
+                raise ValueError(f"Конец диапазона {commit_hash} не является тегом или коммитом "
+                                 f"обойдённой истории.")
+        excluded = self.ancestor_ids(start)
+        included = self.ancestor_ids(end)
+        return [self.commits[commit_id] for commit_id in range(len(self.commits))
+                if included[commit_id] and not excluded[commit_id]]
+
+    def files_in_range(self, start, end):
+        """Возвращает отсортированный список путей, изменённых коммитами диапазона start..end."""
+        path_ids = set()
+        for commit_hash in self.commits_in_range(start, end):
+            path_ids.update(self.paths_of(self.commit_ids[commit_hash]))
+        return sorted(self.paths[path_id] for path_id in path_ids)
+
+
+def build_dependency_graph(repo_path, commits, cache=None):
+    """Формирует граф зависимостей на основе данных о коммитах; cache (GraphCache) хранит уже посчитанные изменения."""
     graph = []
     unique_nodes = set()
 
-    for commit_hash, commit_data in commits.items():
+    for commit_hash, changes in collect_changes(repo_path, commits, cache).items():
         # Добавляем хэш коммита
         if commit_hash not in unique_nodes:
             graph.append(f'"{commit_hash}" : commit')
             unique_nodes.add(commit_hash)
 
-        # Читаем дерево для каждого коммита
-        tree_data = read_git_object(repo_path, commit_hash)
-        if tree_data:
-            tree_lines = tree_data.decode(errors='replace').split('\n')
-            for line in tree_lines:
-                parts = line.strip().split()
-                if len(parts) > 1 and parts[-1]:  # Проверка валидности имени файла
-                    file_path = parts[-1]
-                    # Фильтруем подозрительные или ненужные узлы
-                    if "+0300" not in file_path and not file_path.startswith(' '):
-                        if file_path not in unique_nodes:
-                            graph.append(f'"{file_path}" : file/folder')
-                            unique_nodes.add(file_path)
-                        graph.append(f'"{commit_hash}" --> "{file_path}" : modifies')
+        for file_path, _ in changes:
+            if file_path not in unique_nodes:
+                graph.append(f'"{file_path}" : file/folder')
+                unique_nodes.add(file_path)
+            graph.append(f'"{commit_hash}" --> "{file_path}" : modifies')
 
     return graph
 
@@ -155,18 +1009,188 @@ def generate_plantuml_code(graph):
     plantuml_code.append("@enduml")
     return '\n'.join(plantuml_code)
 
+def group_paths(changes):
+    """Группирует изменённые пути по папкам: папка -> имена в ней (порядок первого появления, без повторов)."""
+    grouped = {}
+    for paths in changes.values():
+        for file_path, _ in paths:
+            folder, file = file_path.rpartition('/')[::2]
+            if folder:
+                grouped.setdefault(folder, {})[file] = None
+    return grouped
+
+
+def iter_plantuml(changes):
+    """Построчно выдаёт документ PlantUML для словаря изменений (см. collect_changes)."""
+    yield "@startuml\n"
+    yield "left to right direction\n"
+    for folder, files in group_paths(changes).items():
+        yield f'package "{folder}" {{\n'
+        for file in files:
+            yield f'"{folder}/{file}" : file\n'
+        yield "}\n"
+    unique_nodes = set()
+    for commit_hash, paths in changes.items():
+        if commit_hash not in unique_nodes:
+            unique_nodes.add(commit_hash)
+            yield f'"{commit_hash}" : commit\n'
+        for file_path, _ in paths:
+            if file_path not in unique_nodes:
+                unique_nodes.add(file_path)
+                yield f'"{file_path}" : file/folder\n'
+            yield f'"{commit_hash}" --> "{file_path}" : modifies\n'
+    yield "@enduml\n"
+
+
+def dot_quote(value):
+    return '"' + value.replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+
+def iter_dot(changes):
+    """Построчно выдаёт граф в формате Graphviz DOT; папки оформляются кластерами."""
+    yield "digraph dependencies {\n"
+    yield "  rankdir=LR;\n"
+    for number, (folder, files) in enumerate(group_paths(changes).items()):
+        yield f"  subgraph cluster_{number} {{\n"
+        yield f"    label={dot_quote(folder)};\n"
+        for file in files:
+            yield f"    {dot_quote(folder + '/' + file)};\n"
+        yield "  }\n"
+    for commit_hash, paths in changes.items():
+        yield f"  {dot_quote(commit_hash)} [shape=box];\n"
+        for file_path, _ in paths:
+            yield f"  {dot_quote(commit_hash)} -> {dot_quote(file_path)};\n"
+    yield "}\n"
+
+
+def iter_graphml(changes):
+    """Построчно выдаёт граф в формате GraphML."""
+    yield '<?xml version="1.0" encoding="UTF-8"?>\n'
+    yield '<graphml xmlns="http://graphml.graphdrawing.org/xmlns">\n'
+    yield '  <key id="kind" for="node" attr.name="kind" attr.type="string"/>\n'
+    yield '  <graph id="dependencies" edgedefault="directed">\n'
+    unique_nodes = set()
+    for commit_hash, paths in changes.items():
+        if commit_hash not in unique_nodes:
+            unique_nodes.add(commit_hash)
+            yield f'    <node id={quoteattr(commit_hash)}><data key="kind">commit</data></node>\n'
+        for file_path, is_dir in paths:
+            if file_path not in unique_nodes:
+                unique_nodes.add(file_path)
+                kind = "folder" if is_dir else "file"
+                yield f'    <node id={quoteattr(file_path)}><data key="kind">{kind}</data></node>\n'
+            yield f'    <edge source={quoteattr(commit_hash)} target={quoteattr(file_path)}/>\n'
+    yield '  </graph>\n'
+    yield '</graphml>\n'
+
+
+GRAPH_FORMATS = {'plantuml': iter_plantuml, 'dot': iter_dot, 'graphml': iter_graphml}
+
+
+def write_graph(changes, file_path, graph_format='plantuml'):
+    """Потоково записывает граф в файл в формате plantuml, dot или graphml."""
+    with open(file_path, 'w', encoding='utf-8') as file:
+        file.writelines(GRAPH_FORMATS[graph_format](changes))
+
+
 def save_to_file(content, file_path):
     """Сохраняет содержимое в файл."""
     with open(file_path, 'w') as file:
         file.write(content)
 
+def collapse_changes(changes, max_nodes):
+    """Сворачивает глубокие пути в папки, пока число узлов графа не станет не больше max_nodes."""
+    paths = {file_path for file_changes in changes.values() for file_path, _ in file_changes}
+    if len(changes) + len(paths) <= max_nodes:
+        return changes
+    max_depth = max((file_path.count('/') + 1 for file_path in paths), default=1)
+    depth = 1
+    for candidate in range(max_depth - 1, 0, -1):
+        if len(changes) + len({'/'.join(file_path.split('/')[:candidate]) for file_path in paths}) <= max_nodes:
+            depth = candidate
+            break
+    collapsed = {}
+    for commit_hash, file_changes in changes.items():
+        seen = {}
+        for file_path, is_dir in file_changes:
+            parts = file_path.split('/')
+            if len(parts) > depth:
+                file_path, is_dir = '/'.join(parts[:depth]), True
+            seen[file_path] = seen.get(file_path, False) or is_dir
+        collapsed[commit_hash] = list(seen.items())
+    return collapsed
+
+
+def plantuml_command(plantuml_tool_path, file_paths):
+    """Команда запуска PlantUML: java -jar для .jar, иначе инструмент запускается напрямую."""
+    if plantuml_tool_path.endswith('.jar'):
+        return ['java', '-jar', plantuml_tool_path, *file_paths]
+    return [plantuml_tool_path, *file_paths]
+
+
+class PlantUMLRenderer:
+    """Фоновая визуализация: первый файл рисуется сразу, пока строятся следующие графы, остальные — одним запуском в close()."""
+
+    def __init__(self, plantuml_tool_path):
+        self.plantuml_tool_path = plantuml_tool_path
+        self.pending = []
+        self.process = None
+        self.started = False
+        self.failed = []
+
+    def _finish(self):
+        if self.process is not None:
+            if self.process.wait() != 0:
+                self.failed.append(self.process.args)
+            self.process = None
+
+    def _start(self):
+        files, self.pending = self.pending, []
+        try:
+            self.process = subprocess.Popen(plantuml_command(self.plantuml_tool_path, files))
+        except OSError as e:
+            print(f"Не удалось запустить PlantUML: {e}")
+            self.failed.append(plantuml_command(self.plantuml_tool_path, files))
+
+    def add(self, file_path):
+        """Ставит файл в очередь; PlantUML запускается сразу только для первого файла."""
+        self.pending.append(file_path)
+        # Перезапуск после каждого завершения означал бы JVM на каждый тег, если рисование быстрее построения графа
+        if not self.started:
+            self.started = True
+            self._start()
+
+    def close(self):
+        """Дожидается визуализации всех файлов; возвращает список неудачных команд."""
+        self._finish()
+        if self.pending:
+            self._start()
+            self._finish()
+        return self.failed
+
+
 def visualize_graph(plantuml_tool_path, file_path):
     """Открывает граф с помощью PlantUML."""
-    os.system(f'java -jar {plantuml_tool_path} {file_path}')
+    subprocess.run(plantuml_command(plantuml_tool_path, [file_path]))
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Построение графа зависимостей для коммитов Git.")
     parser.add_argument("--config", required=True, help="Путь к конфигурационному файлу CSV.")
+    parser.add_argument("--stats", action="store_true", help="Вывести статистику кэша объектов.")
+    parser.add_argument("--max-depth", type=int, help="Максимальная глубина обхода истории.")
+    parser.add_argument("--limit", type=int, help="Максимальное число коммитов.")
+    parser.add_argument("--since", help="Не брать коммиты старше даты (ГГГГ-ММ-ДД или UNIX-время).")
+    parser.add_argument("--workers", type=int, help="Число потоков для чтения объектов.")
+    parser.add_argument("--cache", help="Файл кэша обработанных коммитов (по умолчанию cache_path из конфигурации "
+                                        "или ~/.cache/git_dependency_graph.json).")
+    parser.add_argument("--no-cache", action="store_true", help="Не использовать кэш между запусками.")
+    parser.add_argument("--tags", help="Список тегов через запятую (по умолчанию tag_name из конфигурации, "
+                                       "несколько тегов разделяются ';').")
+    parser.add_argument("--all-tags", action="store_true", help="Построить граф для каждого тега репозитория.")
+    parser.add_argument("--format", choices=sorted(GRAPH_FORMATS), default="plantuml", help="Формат выходного файла.")
+    parser.add_argument("--max-nodes", type=int, help="Сворачивать глубокие пути в папки, если узлов больше N.")
+    parser.add_argument("--touching", help="Вывести коммиты, изменявшие путь.")
+    parser.add_argument("--range", help="Вывести файлы, изменённые коммитами диапазона A..B.")
     args = parser.parse_args()
 
     # Загружаем конфигурацию
@@ -178,29 +1202,74 @@ if __name__ == "__main__":
     tag_name = config.get("tag_name")
     output_path = config.get("output_path", "output.puml")
 
-    if not (plantuml_tool and repo_path and tag_name):
+    if not (plantuml_tool and repo_path):
         raise ValueError("Конфигурационный файл должен содержать параметры 'plantuml_tool', 'repo_path' и 'tag_name'.")
 
-    # Получаем хэш коммита тега
-    tag_ref_path = os.path.join(repo_path, ".git", "refs", "tags", tag_name)
-    if not os.path.exists(tag_ref_path):
-        raise ValueError(f"Тег {tag_name} не найден в репозитории.")
+    packed_refs = read_packed_refs(repo_path)
+    if args.all_tags:
+        tag_names = list_tags(repo_path, packed_refs)
+    elif args.tags:
+        tag_names = [name.strip() for name in args.tags.split(",") if name.strip()]
+    else:
+        tag_names = [name.strip() for name in (tag_name or "").split(";") if name.strip()]
 
-    with open(tag_ref_path, 'r') as f:
-        tag_commit_hash = f.read().strip()
+    if not tag_names:
+        raise ValueError("Конфигурационный файл должен содержать параметры 'plantuml_tool', 'repo_path' и 'tag_name'.")
+
+    since = None
+    if args.since:
+        since = int(args.since) if args.since.isdigit() else int(datetime.datetime.strptime(args.since, "%Y-%m-%d").timestamp())
+    # Кэш общий для всех тегов: уже пройденная история и изменения не пересчитываются
+    cache_path = None
+    if not args.no_cache:
+        cache_path = args.cache or config.get("cache_path") or os.path.join(
+            os.path.expanduser("~"), ".cache", "git_dependency_graph.json")
+    cache = GraphCache(cache_path, repo_path)
+
+    batch = len(tag_names) > 1
+    renderer = PlantUMLRenderer(plantuml_tool)
+    missing_tags = []
+    try:
+        for tag_name in tag_names:
+            # Получаем хэш коммита тега
+            tag_commit_hash = resolve_tag(repo_path, tag_name, packed_refs)
+            if tag_commit_hash is None:
+                print(f"Тег {tag_name} не найден в репозитории, пропускаем.")
+                missing_tags.append(tag_name)
+                continue
 
-    # Получаем историю коммитов
-    commit_history = get_commit_history(repo_path, tag_commit_hash)
+            # Получаем историю коммитов
+            commit_history = get_commit_history(repo_path, tag_commit_hash, args.max_depth, args.limit, since,
+                                                args.workers, details=False, cache=cache)
 
-    # Строим граф зависимостей
-    graph = build_dependency_graph(repo_path, commit_history)
+            # Вычисляем изменения коммитов и потоково записываем граф
+            changes = collect_changes(repo_path, commit_history, cache)
+            tag_output_path = output_path_for_tag(output_path, tag_name, batch)
+            graph_changes = collapse_changes(changes, args.max_nodes) if args.max_nodes else changes
+            write_graph(graph_changes, tag_output_path, args.format)
 
-    # Группируем файлы в пакеты
-    plantuml_code = group_files_in_packages(graph)
+            # Визуализируем граф в фоне, пока строится следующий
+            if args.format == "plantuml":
+                renderer.add(tag_output_path)
 
-    # Сохраняем результат
-    save_to_file(plantuml_code, output_path)
+            # Запросы к графу
+            if args.touching or args.range:
+                dependency_graph = DependencyGraph(commit_history, changes)
+                if args.touching:
+                    print("\n".join(dependency_graph.commits_touching(args.touching)))
+                if args.range:
+                    # Концы диапазона — хэши коммитов или имена тегов
+                    start, end = [resolve_tag(repo_path, name, packed_refs) or name if name else tag_commit_hash
+                                  for name in args.range.partition("..")[::2]]
+                    print("\n".join(dependency_graph.files_in_range(start, end)))
+    finally:
+        # История и изменения уже обработанных тегов сохраняются даже при ошибке
+        cache.save()
+        for command in renderer.close():
+            print(f"Ошибка визуализации: {subprocess.list2cmdline(command)}")
 
-    # Визуализируем граф
-    visualize_graph(plantuml_tool, output_path)
+    if len(missing_tags) == len(tag_names):
+        raise ValueError(f"Теги не найдены в репозитории: {', '.join(missing_tags)}.")
 
+    if args.stats:
+        print(get_object_store(repo_path).stats())
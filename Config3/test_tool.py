@@ -1,5 +1,8 @@
 import unittest
-from tool import lexer, parse, evaluate_expression
+import mmap
+import tempfile
+import types
+from tool import lexer, parse, evaluate_expression, Kind, SyntaxError
 
 class TestConfigLanguage(unittest.TestCase):
     def test_constants(self):
@@ -22,5 +25,39 @@ class TestConfigLanguage(unittest.TestCase):
         config = parse(tokens)
         self.assertEqual(config, {'nested': [[1, 2], [3, 4]]})
 
+    def test_lexer_positions(self):
+        tokens = lexer("a: 1\n(comment\n x )\nbb: 'two\nlines' % c\n  c: ?[a 1 +]")
+        self.assertIsInstance(tokens, types.GeneratorType)
+        tokens = list(tokens)
+        self.assertEqual(tokens[0], ('NAME', 'a', 1, 1))
+        self.assertEqual(tokens[3], (Kind.NAME, 'bb', 4, 1))
+        self.assertEqual(tokens[5], ('STRING', "'two\nlines'", 4, 5))
+        self.assertEqual(tokens[6][2:], (6, 3))
+        self.assertIs(tokens[6].kind, Kind.NAME)
+        self.assertEqual(parse(tokens), {'a': 1, 'bb': 'two\nlines', 'c': 2})
+
+    def test_lexer_bytes_and_mmap(self):
+        text = "name: 'пример'\nitems: << 1, 2 >>\n"
+        expected = list(lexer(text))
+        self.assertEqual([token[:3] for token in lexer(text.encode())], [token[:3] for token in expected])
+        with tempfile.TemporaryFile() as f:
+            f.write(text.encode())
+            f.flush()
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                self.assertEqual(parse(lexer(data)), {'name': 'пример', 'items': [1, 2]})
+
+    def test_lexer_error_position(self):
+        with self.assertRaisesRegex(SyntaxError, 'at line 2, column 4'):
+            list(lexer("a: 1\nb: @"))
+        with self.assertRaisesRegex(SyntaxError, 'Unexpected character: \r at line 1, column 5'):
+            list(lexer(b"a: 1\r\n"))
+
+    def test_multiline_comment(self):
+        # ')' внутри строки или однострочного комментария не закрывает комментарий
+        tokens = list(lexer("(comment 'x)' % y)\n Это ' )\na: 1 (comment z)"))
+        self.assertEqual(tokens, [('NAME', 'a', 3, 1), ('CONST_DECL', ':', 3, 2), ('NUMBER', '1', 3, 4)])
+        with self.assertRaisesRegex(SyntaxError, 'Unclosed multi-line comment'):
+            list(lexer("a: 1 (comment 'x)'"))
+
 if __name__ == '__main__':
     unittest.main()
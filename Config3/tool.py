@@ -1,73 +1,147 @@
 import re
 import sys
 import toml
+from collections import namedtuple
+from enum import Enum
 
 # Класс для обработки синтаксических ошибок
 class SyntaxError(Exception):
     pass
 
 
+# Виды токенов; Kind наследует str, поэтому сравнение со строками ('NUMBER') продолжает работать
+class Kind(str, Enum):
+    MCOMMENT_START = 'MCOMMENT_START'
+    MCOMMENT_END = 'MCOMMENT_END'
+    ARRAY_START = 'ARRAY_START'
+    ARRAY_END = 'ARRAY_END'
+    COMMA = 'COMMA'
+    NAME = 'NAME'
+    NUMBER = 'NUMBER'
+    STRING = 'STRING'
+    CONST_DECL = 'CONST_DECL'
+    EXPR_START = 'EXPR_START'
+    EXPR_END = 'EXPR_END'
+    DICT_START = 'DICT_START'
+    DICT_KEY = 'DICT_KEY'
+    DICT_VALUE = 'DICT_VALUE'
+    DICT_END = 'DICT_END'
+    OPERATOR = 'OPERATOR'
+    FUNC = 'FUNC'
+    COMMENT = 'COMMENT'
+    SKIP = 'SKIP'
+    MISMATCH = 'MISMATCH'
+
+    def __str__(self):
+        return self.value
+
+
+# Токен: вид, текст, строка и столбец начала (нумерация с 1)
+Token = namedtuple('Token', 'kind value line column')
+
+# Многострочный комментарий целиком: ')' внутри строки или однострочного комментария его не закрывает.
+# Альтернативы не пересекаются (одиночная кавычка — только если закрывающей дальше нет, '%...' — только
+# до конца строки), поэтому на незакрытом комментарии нет экспоненциального перебора.
+MULTILINE_COMMENT = r"\(comment(?:[^)'%]|'[^']*'|'(?![^']*')|%[^\n]*(?![^\n]))*\)"
+
+TOKEN_SPECIFICATION = [
+    # Пропуски и комментарии (Kind.COMMENT) поглощаются одним совпадением вместе с переводами строк
+    (Kind.SKIP, r'(?:[ \t\n]+|%[^\n]*|' + MULTILINE_COMMENT + r')+'),
+    (Kind.MCOMMENT_START, r'\(comment'),  # Начало незакрытого многострочного комментария
+    (Kind.MCOMMENT_END, r'\)'),  # Конец многострочного комментария
+    (Kind.ARRAY_START, r'<<'),  # Начало массива
+    (Kind.ARRAY_END, r'>>'),  # Конец массива
+    (Kind.COMMA, r','),  # Запятая
+    (Kind.NAME, r'[a-zA-Z][_a-zA-Z0-9]*'),  # Имена
+    (Kind.NUMBER, r'\d+'),  # Числа
+    (Kind.STRING, r"'[^']*'"),  # Строки
+    (Kind.CONST_DECL, r':'),  # Объявление константы
+    (Kind.EXPR_START, r'\?\['),  # Начало выражения
+    (Kind.EXPR_END, r'\]'),  # Конец выражения
+    (Kind.DICT_START, r'\['),  # Открывающая скобка словаря
+    (Kind.DICT_KEY, r'[a-zA-Z][_a-zA-Z0-9]*'),  # Ключ словаря
+    (Kind.DICT_VALUE, r"'[^']*'"),  # Значение словаря
+    (Kind.DICT_END, r'\]'),  # Закрывающая скобка словаря
+    (Kind.OPERATOR, r'[+\-*/]'),  # Операторы
+    (Kind.FUNC, r'len'),  # Функция len
+    (Kind.MISMATCH, r'.'),  # Любой другой символ
+]
+
+# Регулярные выражения компилируются один раз: для str и для bytes/mmap.
+# Пробелы перед токеном поглощаются тем же совпадением, SKIP нужен для переводов строк и комментариев.
+TOKEN_REGEX = '[ \\t]*(?:' + '|'.join(f'(?P<{kind.value}>{pattern})'
+                                       for kind, pattern in TOKEN_SPECIFICATION) + ')'
+TOKEN_PATTERN = re.compile(TOKEN_REGEX)
+TOKEN_PATTERN_BYTES = re.compile(TOKEN_REGEX.encode())
+KINDS_BY_GROUP = [None] + [kind for kind, _ in TOKEN_SPECIFICATION]  # номер группы -> вид токена
+# Текст токенов с постоянным значением: для них не нужны group() и декодирование
+CONSTANT_VALUES = {
+    Kind.MCOMMENT_END: ')',
+    Kind.ARRAY_START: '<<',
+    Kind.ARRAY_END: '>>',
+    Kind.COMMA: ',',
+    Kind.CONST_DECL: ':',
+    Kind.EXPR_START: '?[',
+    Kind.EXPR_END: ']',
+    Kind.DICT_START: '[',
+}
+VALUES_BY_GROUP = [None] + [CONSTANT_VALUES.get(kind) for kind, _ in TOKEN_SPECIFICATION]
+
+
 # Лексер: разбиение входного текста на токены
 def lexer(input_text):
-    token_specification = [
-        ('MCOMMENT_START', r'\(comment'),  # Начало многострочного комментария
-        ('MCOMMENT_END', r'\)'),  # Конец многострочного комментария
-        ('ARRAY_START', r'<<'),  # Начало массива
-        ('ARRAY_END', r'>>'),  # Конец массива
-        ('COMMA', r','),  # Запятая
-        ('NAME', r'[a-zA-Z][_a-zA-Z0-9]*'),  # Имена
-        ('NUMBER', r'\d+'),  # Числа
-        ('STRING', r"'[^']*'"),  # Строки
-        ('CONST_DECL', r':'),  # Объявление константы
-        ('EXPR_START', r'\?\['),  # Начало выражения
-        ('EXPR_END', r'\]'),  # Конец выражения
-        ('DICT_START', r'\['),  # Открывающая скобка словаря
-        ('DICT_KEY', r'[a-zA-Z][_a-zA-Z0-9]*'),  # Ключ словаря
-        ('DICT_VALUE', r"'[^']*'"),  # Значение словаря
-        ('DICT_END', r'\]'),  # Закрывающая скобка словаря
-        ('OPERATOR', r'[+\-*/]'),  # Операторы
-        ('FUNC', r'len'),  # Функция len
-        ('COMMENT', r'%.*'),  # Однострочный комментарий
-        ('SKIP', r'[ \t\n]+'),  # Пропуски
-        ('MISMATCH', r'.'),  # Любой другой символ
-    ]
-    tok_regex = '|'.join(f'(?P<{pair[0]}>{pair[1]})' for pair in token_specification)
-    tokens = []
-    in_multiline_comment = False
+    """Генератор токенов для str, bytes или mmap (для двоичного ввода столбцы считаются в байтах)."""
+    if isinstance(input_text, str):
+        matches = TOKEN_PATTERN.finditer(input_text)
+        newline = '\n'
+        decode = None
+    else:
+        matches = TOKEN_PATTERN_BYTES.finditer(input_text)
+        newline = b'\n'
+        decode = bytes.decode
+    # Локальные имена: обращение к членам Enum в цикле заметно дороже
+    skip, string, comment_start, mismatch = Kind.SKIP, Kind.STRING, Kind.MCOMMENT_START, Kind.MISMATCH
+    kinds, values = KINDS_BY_GROUP, VALUES_BY_GROUP
+    make_token = Token._make
     line_number = 1
-
-    for mo in re.finditer(tok_regex, input_text):
-        kind = mo.lastgroup
-        value = mo.group()
-
-        if kind == 'SKIP':
-            line_number += value.count('\n')
-            continue
-
-        if in_multiline_comment:
-            if kind == 'MCOMMENT_END':
-                in_multiline_comment = False
-            continue
-
-        if kind == 'MCOMMENT_START':
-            in_multiline_comment = True
+    line_start = 0
+
+    for mo in matches:
+        group = mo.lastindex
+        kind = kinds[group]
+        value = values[group]
+        if value is not None:
+            yield make_token((kind, value, line_number, mo.start(group) - line_start + 1))
             continue
 
-        if kind == 'COMMENT':
-            continue  # Игнорируем однострочные комментарии
+        value = mo.group(group)
+        if kind is skip:
+            if newline in value:
+                line_number += value.count(newline)
+                line_start = mo.start(group) + value.rindex(newline) + 1
+            continue  # Пропуски и комментарии
 
-        if kind == 'MISMATCH':
-            raise SyntaxError(f'Unexpected character: {value} at line {line_number}')
+        if kind is comment_start:
+            # Закрытый комментарий целиком поглощается SKIP, сюда попадает только незакрытый
+            raise SyntaxError('Unclosed multi-line comment. Ensure every "(comment" has a closing ")".')
 
-        tokens.append((kind, value))
+        start = mo.start(group)
+        line, column = line_number, start - line_start + 1
+        if kind is string and newline in value:
+            line_number += value.count(newline)
+            line_start = start + value.rindex(newline) + 1
+        if decode is not None:
+            value = decode(value, 'utf-8', 'replace')
 
-    if in_multiline_comment:
-        raise SyntaxError('Unclosed multi-line comment. Ensure every "(comment" has a closing ")".')
+        if kind is mismatch:
+            raise SyntaxError(f'Unexpected character: {value} at line {line}, column {column}')
 
-    return tokens
+        yield make_token((kind, value, line, column))
 
 
 def parse(tokens):
+    if not isinstance(tokens, (list, tuple)):
+        tokens = list(tokens)
     config = {}
     index = 0
 
@@ -75,7 +149,7 @@ def parse(tokens):
         nonlocal index
         if index >= len(tokens):
             raise SyntaxError('Unexpected end of input')
-        kind, value = tokens[index]
+        kind, value = tokens[index][:2]
         if kind == 'NUMBER':
             index += 1
             return int(value)
@@ -147,7 +221,7 @@ def parse(tokens):
         index += 1  # Пропустить '?['
         expr = []
         while index < len(tokens) and tokens[index][0] != 'EXPR_END':
-            kind, value = tokens[index]
+            kind, value = tokens[index][:2]
             if kind in ('NUMBER', 'NAME', 'OPERATOR', 'FUNC'):
                 expr.append(value)
             else: